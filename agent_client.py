@@ -0,0 +1,120 @@
+import json
+import os
+import random
+import threading
+import time
+
+import requests
+from dotenv import load_dotenv
+from urllib3.exceptions import ConnectTimeoutError
+
+load_dotenv()
+
+AGENT_CALL_URL = os.getenv("AGENT_CALL_URL", "https://api.uat.t4s.lfxdigital.app/agents/v1/agent/agent-call")
+AGENT_CONNECT_TIMEOUT = float(os.getenv("AGENT_CONNECT_TIMEOUT", 5))
+AGENT_READ_TIMEOUT = float(os.getenv("AGENT_READ_TIMEOUT", 60))
+AGENT_MAX_RETRIES = int(os.getenv("AGENT_MAX_RETRIES", 2))
+AGENT_BACKOFF = float(os.getenv("AGENT_BACKOFF", 0.5))
+AGENT_POOL_SIZE = int(os.getenv("AGENT_POOL_SIZE", 20))
+
+# Statuses where the request was turned away before reaching the agent. 502 and 504
+# are not retried: the gateway may have passed the request on, and a second POST
+# with the same thread_id could start a duplicate agent run.
+RETRY_STATUSES = {429, 503}
+
+
+class AgentCallError(RuntimeError):
+    """Raised when the agent-call endpoint cannot be reached or rejects the request."""
+
+
+def _backoff_delay(attempt, backoff):
+    # Exponential backoff with full jitter
+    return random.uniform(0, backoff * (2 ** attempt))
+
+
+def _connect_failed(error):
+    """True when a requests ConnectionError happened before the request was sent."""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    # Refused, unresolvable and timed-out connects arrive as urllib3's MaxRetryError
+    # wrapping a ConnectTimeoutError (NewConnectionError is a subclass); a connection
+    # dropped after sending arrives as a ProtocolError instead
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, ConnectTimeoutError)
+
+
+def _parse_body(content_type, text):
+    if "application/json" in (content_type or ""):
+        try:
+            return json.loads(text)
+        except ValueError:
+            pass
+    return text
+
+
+class AgentClient:
+    """
+    Keep-alive client for the agent-call endpoint with timeouts and bounded retries.
+
+    Failures to connect and 429/503 responses are retried with jittered
+    exponential backoff. Connections dropped after the request was sent,
+    read timeouts and 502/504 gateway errors are not retried, because the
+    agent may already be working on the request. Any other failure raises
+    AgentCallError straight away.
+
+    Args:
+        url (str): The agent-call endpoint.
+        connect_timeout (float): Seconds to establish a connection.
+        read_timeout (float): Seconds to wait for the response.
+        max_retries (int): Retries after the first attempt.
+        backoff (float): Base delay in seconds for the retry backoff.
+        pool_size (int): Maximum number of pooled keep-alive connections.
+    """
+
+    def __init__(self, url=AGENT_CALL_URL, connect_timeout=AGENT_CONNECT_TIMEOUT, read_timeout=AGENT_READ_TIMEOUT,
+                 max_retries=AGENT_MAX_RETRIES, backoff=AGENT_BACKOFF, pool_size=AGENT_POOL_SIZE):
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def call(self, payload: dict):
+        """
+        Posts `payload` to the agent and returns the decoded response body.
+
+        Raises:
+            AgentCallError: If the call fails after all retries.
+        """
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = self.session.post(self.url, json=payload, timeout=self.timeout)
+            except requests.exceptions.ConnectionError as e:
+                if last_attempt or not _connect_failed(e):
+                    raise AgentCallError(f"Could not reach the search agent: {e}") from e
+            except requests.exceptions.Timeout as e:
+                raise AgentCallError(f"The search agent did not respond within {self.timeout[1]:.0f} seconds.") from e
+            else:
+                if response.ok:
+                    return _parse_body(response.headers.get("Content-Type"), response.text)
+                if response.status_code not in RETRY_STATUSES or last_attempt:
+                    raise AgentCallError(f"The search agent returned HTTP {response.status_code}: {response.text[:200]}")
+            time.sleep(_backoff_delay(attempt, self.backoff))
+
+
+_lock = threading.Lock()
+_agent_client = None
+
+
+def get_agent_client() -> AgentClient:
+    """Returns the process-wide AgentClient shared by all sessions."""
+    global _agent_client
+    with _lock:
+        if _agent_client is None:
+            _agent_client = AgentClient()
+        return _agent_client
@@ -0,0 +1,298 @@
+"""
+Local evaluator for the arithmetic and date rules in `config_Air8.yaml`'s `check_rules`.
+
+Rules 5, 6, 9, 12 and 13 compare dates, amounts and quantities and need no
+judgment, so they run here over whole batches of extracted orders with numpy
+instead of going to the document checker one order at a time. `split_rules`
+returns the rest (name, address and payment-term comparisons and the like)
+for the LLM.
+
+Each order is a dict of the fields extracted per document type, named as in
+the config's `key_fields`:
+
+    {"order_id": "...",
+     "Purchase Order": {"Date": "2024/03/01", "Total Quantity": "1,000", "Details": [...]},
+     "Invoice": {"Inovice Number": "INV-1", "Invoice Date": "2024/03/20", "Total Price Amount": "5,000.00",
+                 "Details": [{"Description of Goods": "...", "Quantity": "1000", "Unit Cost": "5"}]},
+     "Delivery Document": {"Date": "...", "Shipment Date": "...", "Total Quantity": "...", "Details": [...]}}
+
+Every rule gives each order one of PASS, FAIL or MISSING. MISSING means a
+field the rule needs was absent or unreadable; those orders can still be sent
+to the checker for that rule.
+
+Usage:
+    python air8_rules.py orders.jsonl                # one order per line
+    python air8_rules.py orders.json --json results.json
+"""
+import argparse
+import json
+import re
+import sys
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+import yaml
+
+PASS = "pass"
+FAIL = "fail"
+MISSING = "missing"
+
+PURCHASE_ORDER = "Purchase Order"
+INVOICE = "Invoice"
+DELIVERY = "Delivery Document"
+
+# Thresholds stated in the rule texts
+INVOICE_SHIPMENT_MAX_DAYS = 30
+DELIVERY_QUANTITY_TOLERANCE = 0.05
+# Rounding allowed between the stated total and unit cost x quantity
+AMOUNT_TOLERANCE = 0.01
+
+DATE_FORMATS = ("%Y/%m/%d", "%Y-%m-%d", "%Y.%m.%d", "%d/%m/%Y")
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+_RULE_NUMBER = re.compile(r"^\s*(\d+)\s*[.)]")
+
+
+def parse_date(value):
+    """Reads an extracted date (YYYY/MM/DD, or a few common variants) as datetime64[D]; NaT if unreadable."""
+    if not value:
+        return np.datetime64("NaT", "D")
+    return _parse_date_text(str(value).strip())
+
+
+# Orders of one batch share most of their dates
+@lru_cache(maxsize=4096)
+def _parse_date_text(text):
+    for date_format in DATE_FORMATS:
+        try:
+            return np.datetime64(datetime.strptime(text, date_format).date(), "D")
+        except ValueError:
+            continue
+    return np.datetime64("NaT", "D")
+
+
+def parse_number(value):
+    """Reads an extracted amount or quantity such as 'USD 1,234.50' or '1000 PCS'; NaN if there is none."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    match = _NUMBER.search(str(value or "").replace(",", ""))
+    return float(match.group()) if match else np.nan
+
+
+def _field(order, doc_type, name):
+    return (order.get(doc_type) or {}).get(name)
+
+
+def _details(order, doc_type):
+    details = _field(order, doc_type, "Details")
+    return [detail for detail in details if isinstance(detail, dict)] if isinstance(details, list) else []
+
+
+def _detail_sum(details, *names):
+    # NaN as soon as one line lacks a factor, so a partial sum never passes for a total
+    if not details:
+        return np.nan
+    total = 0.0
+    for detail in details:
+        product = 1.0
+        for name in names:
+            product *= parse_number(detail.get(name))
+        total += product
+    return total
+
+
+def _same_invoice(detail, invoice_number):
+    number = detail.get("Inovice Number") or detail.get("Invoice Number")
+    return not number or not invoice_number or str(number).strip() == str(invoice_number).strip()
+
+
+class OrderFields:
+    """
+    The fields the local rules read, as one numpy array per field across a batch of orders.
+
+    Args:
+        orders (list[dict]): Extracted orders, as described in the module docstring.
+    """
+
+    def __init__(self, orders):
+        self.order_ids = [order.get("order_id") for order in orders]
+        dates = {"po_date": [], "invoice_date": [], "delivery_date": [], "shipment_date": []}
+        numbers = {"invoice_total": [], "invoice_line_total": [], "invoice_quantity": [],
+                   "delivered_quantity": [], "delivery_total_quantity": [], "po_total_quantity": []}
+        for order in orders:
+            dates["po_date"].append(parse_date(_field(order, PURCHASE_ORDER, "Date")))
+            dates["invoice_date"].append(parse_date(_field(order, INVOICE, "Invoice Date")))
+            dates["delivery_date"].append(parse_date(_field(order, DELIVERY, "Date")))
+            dates["shipment_date"].append(parse_date(_field(order, DELIVERY, "Shipment Date")))
+
+            invoice_details = _details(order, INVOICE)
+            invoice_number = _field(order, INVOICE, "Inovice Number") or _field(order, INVOICE, "Invoice Number")
+            delivery_details = _details(order, DELIVERY)
+            numbers["invoice_total"].append(parse_number(_field(order, INVOICE, "Total Price Amount")))
+            numbers["invoice_line_total"].append(_detail_sum(invoice_details, "Quantity", "Unit Cost"))
+            numbers["invoice_quantity"].append(_detail_sum(invoice_details, "Quantity"))
+            numbers["delivered_quantity"].append(
+                _detail_sum([detail for detail in delivery_details if _same_invoice(detail, invoice_number)], "Quantity"))
+            # Stated totals first, the sum of the detail lines otherwise
+            delivery_total = parse_number(_field(order, DELIVERY, "Total Quantity"))
+            numbers["delivery_total_quantity"].append(
+                delivery_total if not np.isnan(delivery_total) else _detail_sum(delivery_details, "Quantity"))
+            po_total = parse_number(_field(order, PURCHASE_ORDER, "Total Quantity"))
+            numbers["po_total_quantity"].append(
+                po_total if not np.isnan(po_total) else _detail_sum(_details(order, PURCHASE_ORDER), "Quantity"))
+
+        for name, values in dates.items():
+            setattr(self, name, np.array(values, dtype="datetime64[D]"))
+        for name, values in numbers.items():
+            setattr(self, name, np.array(values, dtype=float))
+
+    def __len__(self):
+        return len(self.order_ids)
+
+
+def _status(ok, known):
+    return np.where(known, np.where(ok, PASS, FAIL), MISSING)
+
+
+def _both_dates(a, b):
+    return ~np.isnat(a) & ~np.isnat(b)
+
+
+def check_po_date_first(fields):
+    """5. The purchase order is dated before the invoice and the delivery document."""
+    invoice_known = _both_dates(fields.po_date, fields.invoice_date)
+    delivery_known = _both_dates(fields.po_date, fields.delivery_date)
+    ok = ((fields.po_date < fields.invoice_date) | ~invoice_known) & ((fields.po_date < fields.delivery_date) | ~delivery_known)
+    # One missing date must not hide a failure of the other comparison
+    return _status(ok, (invoice_known & delivery_known) | ~ok)
+
+
+def check_invoice_date(fields):
+    """6. The invoice is dated after the purchase order and within 30 days of the delivery's shipment date."""
+    known = _both_dates(fields.invoice_date, fields.po_date) & ~np.isnat(fields.shipment_date)
+    days_from_shipment = np.abs((fields.invoice_date - fields.shipment_date).astype("timedelta64[D]").astype(float))
+    ok = (fields.invoice_date > fields.po_date) & (days_from_shipment <= INVOICE_SHIPMENT_MAX_DAYS)
+    return _status(ok, known)
+
+
+def check_invoice_total(fields):
+    """9. The invoice total equals unit cost times quantity summed over its lines."""
+    known = ~np.isnan(fields.invoice_total) & ~np.isnan(fields.invoice_line_total)
+    ok = np.abs(fields.invoice_total - fields.invoice_line_total) <= AMOUNT_TOLERANCE
+    return _status(ok, known)
+
+
+def check_invoice_quantity(fields):
+    """12. The invoiced quantity equals the quantity delivered under the same invoice number."""
+    known = ~np.isnan(fields.invoice_quantity) & ~np.isnan(fields.delivered_quantity)
+    ok = np.isclose(fields.invoice_quantity, fields.delivered_quantity)
+    return _status(ok, known)
+
+
+def check_delivery_quantity(fields):
+    """13. The delivered total quantity is within ±5% of the purchase order's."""
+    known = ~np.isnan(fields.delivery_total_quantity) & ~np.isnan(fields.po_total_quantity)
+    with np.errstate(invalid="ignore"):
+        ok = np.abs(fields.delivery_total_quantity - fields.po_total_quantity) <= DELIVERY_QUANTITY_TOLERANCE * fields.po_total_quantity
+    return _status(ok, known)
+
+
+# check_rules number -> local check
+LOCAL_RULES = {
+    5: check_po_date_first,
+    6: check_invoice_date,
+    9: check_invoice_total,
+    12: check_invoice_quantity,
+    13: check_delivery_quantity,
+}
+
+
+def rule_number(rule):
+    """The number a `check_rules` entry starts with ('6. Check whether...' -> 6), or None."""
+    match = _RULE_NUMBER.match(str(rule))
+    return int(match.group(1)) if match else None
+
+
+def split_rules(check_rules):
+    """
+    Splits the configured rules into those evaluated here and those left for the LLM.
+
+    Rules are matched by their number, so renumbering `check_rules` in the
+    config must be mirrored in `LOCAL_RULES`.
+
+    Returns:
+        tuple[list, list]: The local rules and the rules that need judgment, as in the config.
+    """
+    local, llm = [], []
+    for rule in check_rules:
+        (local if rule_number(rule) in LOCAL_RULES else llm).append(rule)
+    return local, llm
+
+
+def evaluate(orders, rules=None):
+    """
+    Runs the local rules over a batch of orders.
+
+    Args:
+        orders (list[dict]): Extracted orders.
+        rules (list, optional): Rule numbers or `check_rules` entries to run; all local rules by default.
+            Rules with no local check are ignored.
+
+    Returns:
+        dict: {rule number: array of PASS, FAIL or MISSING aligned with `orders`}.
+    """
+    numbers = [rule if isinstance(rule, int) else rule_number(rule) for rule in (rules or LOCAL_RULES)]
+    fields = OrderFields(orders)
+    return {number: LOCAL_RULES[number](fields) for number in numbers if number in LOCAL_RULES}
+
+
+def results_table(orders, results):
+    """One row per order: its ID and the status of each rule."""
+    columns = sorted(results)
+    return [{"order_id": order.get("order_id"), **{f"rule_{number}": str(results[number][i]) for number in columns}}
+            for i, order in enumerate(orders)]
+
+
+def load_check_rules(config_path="config_Air8.yaml"):
+    with open(config_path, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f).get("check_rules", [])
+
+
+def load_orders(path):
+    """Reads orders from a JSON list or from JSON Lines."""
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    if text.lstrip().startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("orders", help="JSON or JSON Lines file of extracted orders")
+    parser.add_argument("--config", default="config_Air8.yaml", help="Config holding check_rules")
+    parser.add_argument("--json", help="Also write per-order results to this file")
+    args = parser.parse_args(argv)
+
+    local_rules, llm_rules = split_rules(load_check_rules(args.config))
+    orders = load_orders(args.orders)
+    start = datetime.now()
+    results = evaluate(orders, local_rules)
+    elapsed = (datetime.now() - start).total_seconds()
+
+    print(f"Checked {len(orders)} orders against {len(results)} rules in {elapsed:.2f}s")
+    for rule in local_rules:
+        statuses = results[rule_number(rule)]
+        print(f"  {rule}\n    pass {np.sum(statuses == PASS)}, fail {np.sum(statuses == FAIL)}, missing {np.sum(statuses == MISSING)}")
+    print("Left for the document checker:")
+    for rule in llm_rules:
+        print(f"  {rule}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results_table(orders, results), f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""
+Batch mode of the Search page: many supplier or product queries from one CSV.
+
+Queries run as SearchJobs on the shared SearchJobRunner, at most
+`concurrency` of a batch at once, so a batch finishes in about the time of
+its slowest queries rather than the sum of all of them, without taking every
+search slot of the process.
+"""
+import csv
+import io
+import os
+import threading
+import time
+import uuid
+
+from search_jobs import SearchJob, CANCELLED, DONE
+
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", 200))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 8))
+# Results per query kept in the consolidated table
+BATCH_TOP_RESULTS = int(os.getenv("BATCH_TOP_RESULTS", 5))
+
+
+def read_queries(data, images=None, max_queries=BATCH_MAX_QUERIES):
+    """
+    Reads a batch from CSV.
+
+    The file needs a `query` column, an `image` column naming one of `images`,
+    or both; rows with neither are skipped.
+
+    Args:
+        data (bytes): The uploaded CSV.
+        images (dict, optional): Image bytes by file name, for the `image` column.
+        max_queries (int): Largest batch accepted.
+
+    Returns:
+        list[tuple[str, bytes]]: (query, image) per row; either may be empty or None.
+
+    Raises:
+        ValueError: If the file cannot be used, with a message for the user.
+    """
+    images = images or {}
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ValueError("The query file must be UTF-8 encoded CSV.")
+    reader = csv.DictReader(io.StringIO(text))
+    columns = {(name or "").strip().lower(): name for name in reader.fieldnames or []}
+    if "query" not in columns and "image" not in columns:
+        raise ValueError("The query file needs a 'query' column (and optionally an 'image' column).")
+
+    rows = []
+    for line, row in enumerate(reader, start=2):
+        query = (row.get(columns.get("query")) or "").strip()
+        image_name = (row.get(columns.get("image")) or "").strip()
+        if image_name and image_name not in images:
+            raise ValueError(f"Line {line}: image '{image_name}' was not uploaded.")
+        if query or image_name:
+            rows.append((query, images.get(image_name)))
+    if not rows:
+        raise ValueError("The query file has no queries.")
+    if len(rows) > max_queries:
+        raise ValueError(f"The query file has {len(rows)} queries; at most {max_queries} can run in one batch.")
+    return rows
+
+
+class SearchBatch:
+    """
+    The queries of one batch, each a SearchJob, fed to a runner `concurrency` at a time.
+
+    Args:
+        kind (str): 'supplier' or 'product'.
+        rows (list): (query, image) pairs from `read_queries`.
+        concurrency (int): Queries of this batch running at once.
+    """
+
+    def __init__(self, kind, rows, concurrency=BATCH_CONCURRENCY):
+        self.kind = kind
+        self.concurrency = concurrency
+        self.jobs = [SearchJob(kind, str(uuid.uuid4()), str(uuid.uuid4()), query=query) for query, _ in rows]
+        self.images = [image for _, image in rows]
+        self.created_at = time.time()
+        self.cancelled = False
+        self._lock = threading.Lock()
+        self._next = 0
+        self._runner = None
+        self._task = None
+        self._on_done = None
+
+    def start(self, runner, task, on_done=None):
+        """
+        Starts the first `concurrency` queries; each one that ends starts the next.
+
+        Args:
+            runner (SearchJobRunner): Runs the queries.
+            task (callable): `task(job, image)` returns a query's result, as for `SearchJobRunner.submit`.
+            on_done (callable, optional): Called with each job that ran, once it has finished.
+        """
+        self._runner, self._task, self._on_done = runner, task, on_done
+        for _ in range(self.concurrency):
+            self._submit_next()
+        return self
+
+    def _submit_next(self):
+        with self._lock:
+            if self.cancelled or self._next >= len(self.jobs):
+                return
+            index = self._next
+            self._next += 1
+        image = self.images[index]
+        self._runner.submit(self.jobs[index], lambda job: self._task(job, image), on_done=self._job_done)
+
+    def _job_done(self, job):
+        if self._on_done is not None:
+            self._on_done(job)
+        self._submit_next()
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            unstarted = self.jobs[self._next:]
+        for job in self.jobs:
+            if not job.finished and job not in unstarted:
+                job.cancel()
+        for job in unstarted:
+            job.cancel_event.set()
+            job._finish(CANCELLED)
+
+    @property
+    def finished(self):
+        return all(job.finished for job in self.jobs)
+
+    def elapsed(self):
+        finished_at = [job.finished_at for job in self.jobs]
+        end = max(finished_at) if self.finished and finished_at else time.time()
+        return end - self.created_at
+
+    def progress(self):
+        """Returns {status: number of queries}; queries not handed to the runner yet count as queued."""
+        counts = {}
+        for job in self.jobs:
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return counts
+
+    def status_rows(self):
+        """One row per query: status, how it was answered and its timing."""
+        rows = []
+        for number, job in enumerate(self.jobs, start=1):
+            result = job.result or {}
+            search_seconds = None
+            if job.started_at is not None:
+                search_seconds = round((job.finished_at or time.time()) - job.started_at, 1)
+            rows.append({
+                "#": number,
+                "query": job.query or "(image)",
+                "status": job.status,
+                "source": result.get("source"),
+                "results": result.get("total"),
+                "wait_s": round((job.started_at or job.finished_at or time.time()) - job.created_at, 1),
+                "search_s": search_seconds,
+                "error": str(job.error) if job.error else None,
+            })
+        return rows
+
+    def result_rows(self):
+        """The top results of every finished query, ranked within each query, in batch order."""
+        rows = []
+        for number, job in enumerate(self.jobs, start=1):
+            if job.status != DONE:
+                continue
+            for rank, result in enumerate(job.result["top"], start=1):
+                rows.append({"#": number, "query": job.query or "(image)", "rank": rank, **result})
+        return rows
+
+
+def rows_to_csv(rows):
+    """Writes table rows (dicts with the same keys) as CSV text."""
+    output = io.StringIO()
+    if rows:
+        writer = csv.DictWriter(output, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    return output.getvalue()
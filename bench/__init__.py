@@ -0,0 +1 @@
+"""Offline benchmarks for the Search page: stub agent, local mongod and in-memory blob store."""
@@ -0,0 +1,74 @@
+import threading
+
+
+class _Credential:
+    account_key = "YmVuY2htYXJrLWtleQ=="
+
+
+class InMemoryBlobStore:
+    """Blob contents and request counters shared by the fake clients below."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.containers = set()
+        self.blobs = {}
+        self.requests = 0
+        self.bytes_uploaded = 0
+
+    def count(self, uploaded=0):
+        with self.lock:
+            self.requests += 1
+            self.bytes_uploaded += uploaded
+
+
+class FakeContainerClient:
+    def __init__(self, store, container_name):
+        self.store = store
+        self.container_name = container_name
+
+    def exists(self):
+        self.store.count()
+        return self.container_name in self.store.containers
+
+    def create_container(self):
+        self.store.count()
+        self.store.containers.add(self.container_name)
+
+    def get_blob_client(self, blob_name):
+        return FakeBlobClient(self.store, self.container_name, blob_name)
+
+
+class FakeBlobClient:
+    def __init__(self, store, container_name, blob_name):
+        self.store = store
+        self.key = (container_name, blob_name)
+        self.url = f"https://benchmark.blob.core.windows.net/{container_name}/{blob_name}"
+
+    def exists(self):
+        self.store.count()
+        return self.key in self.store.blobs
+
+    def upload_blob(self, data, overwrite=False):
+        data = data.encode() if isinstance(data, str) else data
+        self.store.count(uploaded=len(data))
+        self.store.blobs[self.key] = data
+
+
+class InMemoryBlobServiceClient:
+    """
+    Stand-in for azure.storage.blob.BlobServiceClient covering what image_upload uses.
+
+    Every call that would be a storage round trip is counted on `store`.
+    """
+
+    account_name = "benchmark"
+    credential = _Credential()
+
+    def __init__(self, store=None):
+        self.store = store or InMemoryBlobStore()
+
+    def get_container_client(self, container_name):
+        return FakeContainerClient(self.store, container_name)
+
+    def get_blob_client(self, container, blob):
+        return FakeBlobClient(self.store, container, blob)
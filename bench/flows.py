@@ -0,0 +1,118 @@
+"""
+The Search page's supplier and product flows without Streamlit.
+
+Each call goes through the same steps as a click on "Search Supplier" or
+"Search Product" followed by building the first results page's grid, and
+returns the finished SearchTrace record. The steps themselves come from
+search_flow, as on the page; only the Streamlit rendering is replaced.
+"""
+import uuid
+
+from card_cache import CardCache
+from connections import SEARCH_DB, AGENT_LOG_DB
+from card_summaries import SUPPLIER_SUMMARY_COLLECTION, PRODUCT_SUMMARY_COLLECTION
+from fast_path import lookup_suppliers, lookup_products
+from image_upload import upload_search_image
+from log_waiter import LogWaiter
+from query_cache import normalize_query
+from records import fetch_supplier_records, fetch_product_records
+from result_grid import RAW_PREVIEW_CHARS, supplier_grid_html, product_grid_html
+from search_flow import find_answered_search, run_agent_search, supplier_search_payload, product_search_payload
+from search_history import fetch_result_page
+from search_jobs import SearchJob
+from search_metrics import SearchTrace
+
+# The page's upload container
+BLOB_CONTAINER = 'uploads'
+
+
+class SearchFlows:
+    """
+    Args:
+        client (MongoClient): The client under test.
+        agent_client (AgentClient): Points at the stub agent.
+        blob_service_client: The in-memory blob stand-in.
+        page_size (int): Results rendered per page.
+        use_card_cache (bool): Share card caches across searches, like the page does.
+        use_card_summaries (bool): Read cards from the summary collections, like CARD_SUMMARIES=true.
+        log_timeout (float): Seconds to wait for the agent_log entry.
+    """
+
+    def __init__(self, client, agent_client, blob_service_client, page_size=10, use_card_cache=True,
+                 use_card_summaries=False, log_timeout=30):
+        db = client[SEARCH_DB]
+        self.supplier_collection = db['sub_gold']
+        self.product_collection = db['sub_gold_product']
+        if use_card_summaries:
+            self.supplier_card_collection = db[SUPPLIER_SUMMARY_COLLECTION]
+            self.product_card_collection = db[PRODUCT_SUMMARY_COLLECTION]
+            self.card_fallback = {'supplier': self.supplier_collection, 'product': self.product_collection}
+        else:
+            self.supplier_card_collection = self.supplier_collection
+            self.product_card_collection = self.product_collection
+            self.card_fallback = {'supplier': None, 'product': None}
+        self.supplier_search_collection = db['supplier_search_history']
+        self.product_search_collection = db['product_search_history']
+        self.agent_client = agent_client
+        self.blob_service_client = blob_service_client
+        self.page_size = page_size
+        self.log_timeout = log_timeout
+        self.log_waiter = LogWaiter(client[AGENT_LOG_DB]['agent_log'])
+        self.supplier_card_cache = CardCache() if use_card_cache else None
+        self.product_card_cache = CardCache() if use_card_cache else None
+
+    def supplier_search(self, query, force_refresh=False):
+        return self._search('supplier', query, force_refresh, None,
+                            lambda: lookup_suppliers(self.supplier_collection, query, cache=self.supplier_card_cache),
+                            self.supplier_search_collection, 'supplier_ids',
+                            lambda ids: fetch_supplier_records(self.supplier_card_collection, ids, cache=self.supplier_card_cache,
+                                                               fallback=self.card_fallback['supplier']),
+                            supplier_grid_html)
+
+    def product_search(self, query=None, image=None, force_refresh=False):
+        return self._search('product', query, force_refresh, image,
+                            None if image else lambda: lookup_products(self.product_collection, query, cache=self.product_card_cache),
+                            self.product_search_collection, 'uuid',
+                            lambda ids: fetch_product_records(self.product_card_collection, ids, cache=self.product_card_cache,
+                                                             fallback=self.card_fallback['product']),
+                            product_grid_html)
+
+    def _search(self, kind, query, force_refresh, image, lookup, search_collection, id_key, fetch_records, grid_html):
+        trace = SearchTrace(kind)
+        # Image searches are never served from the query cache
+        normalized_query = normalize_query(query or '') if image is None else ""
+        results, search_record = find_answered_search(trace, lookup, search_collection, normalized_query, force_refresh)
+
+        if results is not None:
+            trace.update(source='fast_path')
+        elif search_record is not None:
+            trace.update(source='cache', search_id=search_record['search_id'])
+        else:
+            job = SearchJob(kind, str(uuid.uuid4()), str(uuid.uuid4()), query=query, trace=trace)
+            trace.update(source='agent', search_id=job.search_id, thread_id=job.thread_id)
+            if run_agent_search(job, self._agent_call, (kind, job, image), self.log_waiter, search_collection,
+                                normalized_query, self.log_timeout) is None:
+                return trace.finish('timeout')
+
+        if results is None:
+            with trace.span('page_fetch'):
+                results = fetch_result_page(search_collection, trace.search_id, 0, self.page_size,
+                                            content_chars=RAW_PREVIEW_CHARS + 1)
+        results = results[:self.page_size]
+        with trace.span('card_fetch'):
+            records, _ = fetch_records([result[id_key] for result in results])
+        with trace.span('render'):
+            shown = [(record, result['reason'], result['content'], result['score'])
+                     for record, result in zip(records, results) if record is not None]
+            html = grid_html(*zip(*shown)) if shown else ""
+        trace.update(render_bytes=len(html.encode('utf-8')))
+        return trace.finish()
+
+    def _agent_call(self, kind, job, image):
+        # Like the page's get_supplier_ids / get_product_ids, with the image upload inside the agent_post span
+        if kind == 'supplier':
+            return self.agent_client.call(supplier_search_payload(job.search_id, job.thread_id, job.query))
+        image_path = None
+        if image is not None:
+            image_path = upload_search_image(image, container_name=BLOB_CONTAINER, blob_service_client=self.blob_service_client)
+        return self.agent_client.call(product_search_payload(job.search_id, job.thread_id, job.query, image_path))
@@ -0,0 +1,195 @@
+"""
+Concurrent-session load test of the Search page's flows.
+
+Drives N simulated sessions at once through the supplier and product flows
+against the same local stand-ins as `bench.run_bench`, stepping N up to find
+where one process saturates. Sessions share the process-wide MongoClient,
+log waiter and card caches, as Streamlit sessions in one container do.
+
+Run it inside the app image with the container's limits to size a
+deployment, e.g.:
+    docker run --cpus 2 --memory 4g <image> python -m bench.load_gen --mongo-uri mongodb://host:27017
+
+Usage:
+    python -m bench.load_gen --start-mongod --sessions 1,5,10,25,50 --duration 30
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import tracemalloc
+
+from bench.run_bench import add_environment_arguments, bench_environment, build_workload, make_image, percentile
+
+# A step that adds sessions but less than this much throughput counts as saturated
+SATURATION_GAIN = 1.1
+
+
+def rss_bytes():
+    """Current resident set size of this process, or 0 where /proc is unavailable."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+class ResourceSampler:
+    """Samples thread count, pooled connections and RSS from a daemon thread, keeping the peaks."""
+
+    def __init__(self, connection_counter, interval=0.2):
+        self.connection_counter = connection_counter
+        self.interval = interval
+        self.peak_threads = 0
+        self.peak_connections = 0
+        self.peak_checked_out = 0
+        self.peak_rss = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="load-sampler", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            self.peak_threads = max(self.peak_threads, threading.active_count())
+            self.peak_connections = max(self.peak_connections, self.connection_counter.live)
+            self.peak_checked_out = max(self.peak_checked_out, self.connection_counter.checked_out)
+            self.peak_rss = max(self.peak_rss, rss_bytes())
+            if self._stop.wait(self.interval):
+                return
+
+
+def run_session(flows, workload, deadline, think_time, latencies, errors, lock):
+    for kind, kwargs in workload:
+        if time.monotonic() >= deadline:
+            return
+        start = time.perf_counter()
+        try:
+            search = flows.supplier_search if kind == "supplier" else flows.product_search
+            record = search(**kwargs)
+            ok = record["status"] == "ok"
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            if ok:
+                latencies.append(elapsed)
+            else:
+                errors.append(elapsed)
+        if think_time:
+            time.sleep(think_time)
+
+
+def run_level(env, sessions, args, connection_counter):
+    """Runs `sessions` concurrent sessions for `args.duration` seconds and returns the level's figures."""
+    # Sessions upload from the same few photos, as buyers re-searching a catalogue shot would
+    images = [make_image(random.Random(args.seed + i)) for i in range(3)]
+    workloads = [build_workload(random.Random(args.seed * 1000 + i), env.supplier_ids, env.product_ids,
+                                args.searches_per_session, args.repeat_ratio, args.lookup_ratio, args.image_ratio, images)
+                 for i in range(sessions)]
+    latencies, errors, lock = [], [], threading.Lock()
+    threads_before = threading.active_count()
+    rss_before = rss_bytes()
+    commands_before = env.counter.snapshot()[0]
+    if args.tracemalloc:
+        tracemalloc.reset_peak()
+        traced_before = tracemalloc.get_traced_memory()[0]
+
+    deadline = time.monotonic() + args.duration
+    start = time.perf_counter()
+    with ResourceSampler(connection_counter) as sampler:
+        workers = [threading.Thread(target=run_session, name=f"session-{i}",
+                                    args=(env.flows, workload, deadline, args.think_time, latencies, errors, lock))
+                   for i, workload in enumerate(workloads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    elapsed = time.perf_counter() - start
+
+    level = {
+        "sessions": sessions,
+        "searches": len(latencies),
+        "errors": len(errors),
+        "throughput": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "mongo_cmds_s": round((env.counter.snapshot()[0] - commands_before) / elapsed, 1),
+        "peak_conns": sampler.peak_connections,
+        "peak_checked_out": sampler.peak_checked_out,
+        "peak_threads": sampler.peak_threads,
+        "threads_per_session": round((sampler.peak_threads - threads_before) / sessions, 2),
+        "rss_mb_per_session": round(max(0, sampler.peak_rss - rss_before) / sessions / 2 ** 20, 2),
+    }
+    if args.tracemalloc:
+        level["traced_kb_per_session"] = round((tracemalloc.get_traced_memory()[1] - traced_before) / sessions / 1024, 1)
+    return level
+
+
+def find_saturation(levels):
+    """Returns the last session count whose step still raised throughput meaningfully, or None."""
+    for previous, level in zip(levels, levels[1:]):
+        if level["throughput"] < previous["throughput"] * SATURATION_GAIN or level["errors"]:
+            return previous["sessions"]
+    return None
+
+
+def print_levels(levels):
+    columns = list(levels[0])
+    widths = [len(column) + 2 for column in columns]
+    print("".join(f"{column:>{width}}" for column, width in zip(columns, widths)))
+    for level in levels:
+        print("".join(f"{level[column]:>{width}}" for column, width in zip(columns, widths)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_environment_arguments(parser)
+    parser.add_argument("--sessions", default="1,5,10,25,50", help="Comma-separated concurrent session counts to step through")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds per level")
+    parser.add_argument("--searches-per-session", type=int, default=200, help="Upper bound on searches per session and level")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Seconds a session pauses between searches")
+    parser.add_argument("--tracemalloc", action="store_true", help="Also report Python heap per session (slows the run)")
+    args = parser.parse_args(argv)
+
+    if not args.mongo_uri and not args.start_mongod:
+        parser.error("pass --mongo-uri or --start-mongod")
+    session_counts = sorted({int(count) for count in args.sessions.split(",")})
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    with bench_environment(args) as env:
+        from connections import connection_counter, MONGO_MAX_POOL_SIZE
+
+        levels = []
+        for sessions in session_counts:
+            print(f"Running {sessions} session(s) for {args.duration:.0f}s...")
+            levels.append(run_level(env, sessions, args, connection_counter))
+
+    print_levels(levels)
+    saturation = find_saturation(levels)
+    if saturation is None:
+        print(f"Throughput still scaled at {session_counts[-1]} sessions; raise --sessions to find the limit.")
+    else:
+        print(f"Throughput stops scaling beyond ~{saturation} concurrent sessions (MongoDB pool size {MONGO_MAX_POOL_SIZE}).")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "levels": levels, "saturation": saturation}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,306 @@
+"""
+Offline end-to-end benchmark of the Search page's flows.
+
+Stands in for the three external services: a local mongod seeded with
+synthetic gold records, a stub agent-call endpoint, and an in-memory blob
+store. The app is pointed at the `bench-*` databases through SEARCH_DB and
+AGENT_LOG_DB, so a run never touches the real ones.
+
+Reports search latency percentiles, MongoDB round trips and bytes per
+search, and blob traffic, grouped by how each search was answered.
+
+Usage:
+    python -m bench.run_bench --start-mongod                      # temporary replica set
+    python -m bench.run_bench --mongo-uri mongodb://localhost:27017 --searches 200 --agent-delay 0.5
+"""
+import argparse
+import io
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import bson
+from pymongo import MongoClient, monitoring
+
+from bench.fake_blob import InMemoryBlobServiceClient
+from bench.seed import BENCH_SEARCH_DB, BENCH_AGENT_LOG_DB, seed, WORDS
+from bench.stub_agent import StubAgent
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Counts the commands and BSON bytes sent and received by the clients it is registered on."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.commands = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def started(self, event):
+        size = len(bson.encode(event.command))
+        with self._lock:
+            self.commands += 1
+            self.bytes_sent += size
+
+    def succeeded(self, event):
+        size = len(bson.encode(event.reply))
+        with self._lock:
+            self.bytes_received += size
+
+    def failed(self, event):
+        pass
+
+    def snapshot(self):
+        with self._lock:
+            return self.commands, self.bytes_sent, self.bytes_received
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of `values`."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))]
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_mongod():
+    """
+    Starts a throwaway single-node replica set, so change streams work as on Atlas.
+
+    Returns:
+        tuple[str, Popen, str]: The connection string, the process and its data directory.
+    """
+    if shutil.which("mongod") is None:
+        sys.exit("mongod is not on PATH; install MongoDB or pass --mongo-uri.")
+    port = _free_port()
+    dbpath = tempfile.mkdtemp(prefix="bench-mongod-")
+    process = subprocess.Popen(["mongod", "--replSet", "bench", "--port", str(port), "--bind_ip", "127.0.0.1",
+                                "--dbpath", dbpath, "--quiet"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    uri = f"mongodb://127.0.0.1:{port}/?directConnection=true"
+    admin = MongoClient(uri, serverSelectionTimeoutMS=30000)
+    admin.admin.command("replSetInitiate", {"_id": "bench", "members": [{"_id": 0, "host": f"127.0.0.1:{port}"}]})
+    deadline = time.time() + 30
+    while not admin.admin.command("hello").get("isWritablePrimary"):
+        if time.time() > deadline:
+            sys.exit("Replica set did not elect a primary within 30 seconds.")
+        time.sleep(0.2)
+    admin.close()
+    return uri, process, dbpath
+
+
+def make_image(rng, size=(3024, 4032)):
+    """A camera-sized JPEG, so the downscale path does real work."""
+    from PIL import Image
+    small = (size[0] // 32, size[1] // 32)
+    image = Image.frombytes("RGB", small, rng.randbytes(small[0] * small[1] * 3)).resize(size)
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=95)
+    return output.getvalue()
+
+
+def build_workload(rng, supplier_ids, product_ids, searches, repeat_ratio, lookup_ratio, image_ratio, images=None):
+    """
+    Returns (kind, kwargs) pairs mixing agent searches, repeated queries,
+    fast-path lookups and image searches.
+    """
+    workload, seen = [], []
+    images = images or [make_image(rng) for _ in range(3)]
+    for _ in range(searches):
+        kind = rng.choice(["supplier", "product"])
+        roll = rng.random()
+        if roll < lookup_ratio:
+            query = rng.choice(supplier_ids) if kind == "supplier" else rng.choice(product_ids)
+            workload.append((kind, {"query": query}))
+        elif roll < lookup_ratio + repeat_ratio and seen:
+            workload.append(rng.choice(seen))
+        elif kind == "product" and roll < lookup_ratio + repeat_ratio + image_ratio:
+            workload.append((kind, {"query": None, "image": rng.choice(images)}))
+        else:
+            item = (kind, {"query": " ".join(rng.sample(WORDS, 3)) + f" {rng.randrange(10 ** 6)}"})
+            seen.append(item)
+            workload.append(item)
+    return workload
+
+
+def run(flows, workload, counter, blob_store):
+    samples = []
+    for kind, kwargs in workload:
+        commands, sent, received = counter.snapshot()
+        blob_requests, blob_bytes = blob_store.requests, blob_store.bytes_uploaded
+        search = flows.supplier_search if kind == "supplier" else flows.product_search
+        record = search(**kwargs)
+        after = counter.snapshot()
+        samples.append({
+            "kind": kind,
+            "source": ("image" if kwargs.get("image") else record["source"]) if record["status"] == "ok" else record["status"],
+            "seconds": record["total_seconds"],
+            "spans": record["spans"],
+            "round_trips": after[0] - commands,
+            "bytes_sent": after[1] - sent,
+            "bytes_received": after[2] - received,
+            "blob_requests": blob_store.requests - blob_requests,
+            "blob_bytes": blob_store.bytes_uploaded - blob_bytes,
+            "render_bytes": record["render_bytes"] or 0,
+        })
+    return samples
+
+
+def summarize(samples):
+    groups = {"all": samples}
+    for sample in samples:
+        groups.setdefault(f"{sample['kind']}/{sample['source']}", []).append(sample)
+
+    summary = {}
+    for name, group in sorted(groups.items()):
+        seconds = [sample["seconds"] for sample in group]
+        n = len(group)
+        summary[name] = {
+            "searches": n,
+            "p50_ms": round(percentile(seconds, 50) * 1000, 1),
+            "p95_ms": round(percentile(seconds, 95) * 1000, 1),
+            "p99_ms": round(percentile(seconds, 99) * 1000, 1),
+            "round_trips": round(sum(sample["round_trips"] for sample in group) / n, 1),
+            "kb_received": round(sum(sample["bytes_received"] for sample in group) / n / 1024, 1),
+            "kb_sent": round(sum(sample["bytes_sent"] for sample in group) / n / 1024, 1),
+            "blob_requests": round(sum(sample["blob_requests"] for sample in group) / n, 2),
+            "blob_kb": round(sum(sample["blob_bytes"] for sample in group) / n / 1024, 1),
+            "render_kb": round(sum(sample["render_bytes"] for sample in group) / n / 1024, 1),
+        }
+    return summary
+
+
+def print_summary(summary):
+    columns = ["searches", "p50_ms", "p95_ms", "p99_ms", "round_trips", "kb_received", "kb_sent", "blob_requests", "blob_kb", "render_kb"]
+    print(f"{'group':<20}" + "".join(f"{column:>14}" for column in columns))
+    for name, row in summary.items():
+        print(f"{name:<20}" + "".join(f"{row[column]:>14}" for column in columns))
+    print("round_trips, kb_*, blob_* and render_kb are per search; MongoDB traffic includes the shared agent_log change stream.")
+
+
+def add_environment_arguments(parser):
+    """Adds the options shared by the benchmark and the load test."""
+    parser.add_argument("--mongo-uri", help="An existing (preferably replica set) MongoDB to seed bench-* databases in")
+    parser.add_argument("--reset", action="store_true", help="Replace bench-* collections that already hold documents")
+    parser.add_argument("--start-mongod", action="store_true", help="Start a temporary single-node replica set")
+    parser.add_argument("--suppliers", type=int, default=5000)
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--agent-delay", type=float, default=0.5, help="Seconds of simulated agent work per search")
+    parser.add_argument("--agent-results", type=int, default=20, help="Results written per agent search")
+    parser.add_argument("--agent-blocking", action="store_true", help="Stub responds after writing agent_log")
+    parser.add_argument("--repeat-ratio", type=float, default=0.2, help="Share of searches repeating an earlier query")
+    parser.add_argument("--lookup-ratio", type=float, default=0.2, help="Share of plain ID lookups")
+    parser.add_argument("--image-ratio", type=float, default=0.1, help="Share of image-only product searches")
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--no-card-cache", action="store_true")
+    parser.add_argument("--card-summaries", action="store_true", help="Build and read the card summary collections")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="Also write the summary and raw samples to this file")
+
+
+@contextmanager
+def bench_environment(args):
+    """
+    Seeds MongoDB, starts the stub agent and builds the flows under test.
+
+    Yields:
+        SimpleNamespace: `flows`, `counter`, `blob_store`, `supplier_ids` and `product_ids`.
+    """
+    mongod = None
+    if args.start_mongod:
+        uri, process, dbpath = start_mongod()
+        mongod = (process, dbpath)
+    else:
+        uri = args.mongo_uri
+
+    stub = None
+    try:
+        # Seeding and the stub agent use clients created before the command
+        # listener is registered, so only the app's own traffic is counted
+        setup_client = MongoClient(uri)
+        print(f"Seeding {args.suppliers} suppliers and {args.products} products...")
+        try:
+            supplier_ids, product_ids = seed(setup_client, args.suppliers, args.products, seed_value=args.seed, reset=args.reset)
+        except ValueError as e:
+            sys.exit(str(e))
+        stub = StubAgent(setup_client, supplier_ids, product_ids, delay=args.agent_delay,
+                         results=args.agent_results, blocking=args.agent_blocking, seed=args.seed)
+        agent_url = stub.start()
+
+        counter = CommandCounter()
+        monitoring.register(counter)
+
+        os.environ["POC_MONGOCONN"] = uri
+        os.environ["SEARCH_DB"] = BENCH_SEARCH_DB
+        os.environ["AGENT_LOG_DB"] = BENCH_AGENT_LOG_DB
+        os.environ["AGENT_CALL_URL"] = agent_url
+        os.environ.setdefault("SEARCH_METRICS_LOG", "")
+        from agent_client import AgentClient
+        from connections import get_mongo_client
+        from bench.flows import SearchFlows
+        from manage_indexes import ensure_indexes
+
+        import connections
+        if (connections.SEARCH_DB, connections.AGENT_LOG_DB) != (BENCH_SEARCH_DB, BENCH_AGENT_LOG_DB):
+            sys.exit("connections was imported before the benchmark databases were set.")
+        client = get_mongo_client("POC_MONGOCONN")
+        ensure_indexes(client)
+        if args.card_summaries:
+            from card_summaries import rebuild_all
+            rebuild_all(setup_client)
+        blob_service_client = InMemoryBlobServiceClient()
+        flows = SearchFlows(client, AgentClient(url=agent_url), blob_service_client,
+                            page_size=args.page_size, use_card_cache=not args.no_card_cache,
+                            use_card_summaries=args.card_summaries)
+        yield SimpleNamespace(flows=flows, counter=counter, blob_store=blob_service_client.store,
+                              supplier_ids=supplier_ids, product_ids=product_ids)
+    finally:
+        if stub is not None:
+            stub.stop()
+        if mongod is not None:
+            mongod[0].terminate()
+            mongod[0].wait(timeout=30)
+            shutil.rmtree(mongod[1], ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_environment_arguments(parser)
+    parser.add_argument("--searches", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    if not args.mongo_uri and not args.start_mongod:
+        parser.error("pass --mongo-uri or --start-mongod")
+
+    with bench_environment(args) as env:
+        rng = random.Random(args.seed)
+        workload = build_workload(rng, env.supplier_ids, env.product_ids, args.searches,
+                                  args.repeat_ratio, args.lookup_ratio, args.image_ratio)
+        print(f"Running {len(workload)} searches...")
+        samples = run(env.flows, workload, env.counter, env.blob_store)
+        summary = summarize(samples)
+        print_summary(summary)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "summary": summary, "samples": samples}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
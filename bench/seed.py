@@ -0,0 +1,121 @@
+"""
+Seeds a scratch MongoDB with synthetic `sub_gold` and `sub_gold_product` records.
+
+Documents are shaped like the production gold records, including the bulky
+audit, order and image sections the cards never render, so projection and
+caching changes show up in bytes transferred.
+
+Records go into the `bench-search-agent` and `bench-ai-agent` databases,
+never the app's own, and collections that already hold documents are only
+replaced with `--reset`.
+
+Usage:
+    python -m bench.seed --mongo-uri mongodb://localhost:27017 --suppliers 5000 --products 5000
+"""
+import argparse
+import random
+import sys
+
+from pymongo import MongoClient
+
+COUNTRIES = ["China", "India", "Vietnam", "Indonesia", "Bangladesh", "Turkey", "Spain", "Cambodia"]
+FAMILIES = ["Apparel", "Toys", "Home", "Footwear", "Accessories", "Electronics"]
+# The benchmarks point the app at these through SEARCH_DB and AGENT_LOG_DB
+BENCH_SEARCH_DB = "bench-search-agent"
+BENCH_AGENT_LOG_DB = "bench-ai-agent"
+SEEDED_COLLECTIONS = ["sub_gold", "sub_gold_product", "supplier_search_history", "product_search_history"]
+
+WORDS = ["cotton", "denim", "bunny", "dress", "plush", "toy", "jacket", "knit", "woven", "kids",
+         "nintendo", "sneaker", "bag", "lamp", "cushion", "organic", "recycled", "summer", "winter"]
+
+
+def _words(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def supplier_document(i, rng):
+    return {
+        "System": {"ID": f"SUP{i:06d}", "Source": "benchmark"},
+        "SupplierBasic": {
+            "Demographics": {
+                "EntityFullName": f"{_words(rng, 2).title()} Manufacturing Co {i}",
+                "RegistrationCountry": rng.choice(COUNTRIES),
+                "YearEstablished": rng.randint(1960, 2020),
+                "HeadquarterAddress": f"{rng.randint(1, 999)} Industrial Road, {rng.choice(COUNTRIES)}",
+            },
+            "Contacts": [{"Name": f"Contact {j}", "Email": f"contact{j}@supplier{i}.example"} for j in range(3)],
+        },
+        "Audit": [{"Date": f"20{rng.randint(10, 24)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}",
+                   "Result": rng.choice(["Excellent", "Good", "Fair"]),
+                   "Notes": _words(rng, 60)} for _ in range(12)],
+        "Orders": [{"PO": f"PO{i}{j}", "Item": _words(rng, 4), "Quantity": rng.randint(100, 50000)} for j in range(40)],
+        "FacilityImage": ["data:image/jpeg;base64," + "A" * 4000 for _ in range(3)],
+    }
+
+
+def product_document(i, rng):
+    has_image = rng.random() < 0.7
+    return {
+        "product_id": f"PRD{i:06d}",
+        "item_description": f"{_words(rng, 3)} {i}",
+        "product_family": rng.choice(FAMILIES),
+        "product_category": _words(rng, 1).title(),
+        "has_image": "yes" if has_image else "no",
+        "image_url": f"https://benchmark.blob.core.windows.net/products/{i}.jpg" if has_image else None,
+        "Specification": {"Material": _words(rng, 8), "Size": _words(rng, 4), "Notes": _words(rng, 80)},
+        "OrderHistory": [{"PO": f"PO{i}{j}", "Buyer": _words(rng, 2), "Quantity": rng.randint(10, 5000)} for j in range(30)],
+    }
+
+
+def seed(client, suppliers=5000, products=5000, seed_value=7, batch_size=1000, reset=False):
+    """
+    Fills the benchmark databases with freshly generated records.
+
+    Args:
+        reset (bool): Drop benchmark collections that already hold documents.
+
+    Returns:
+        tuple[list, list]: The supplier `System.ID`s and product ObjectId strings.
+
+    Raises:
+        ValueError: If a benchmark collection is not empty and `reset` is False.
+    """
+    rng = random.Random(seed_value)
+    db = client[BENCH_SEARCH_DB]
+    collections = [db[name] for name in SEEDED_COLLECTIONS] + [client[BENCH_AGENT_LOG_DB]["agent_log"]]
+    if not reset:
+        used = [collection.full_name for collection in collections if collection.find_one({}, {"_id": 1}) is not None]
+        if used:
+            raise ValueError(f"{', '.join(used)} already hold documents; pass --reset to replace them.")
+    for collection in collections:
+        collection.drop()
+
+    supplier_ids, product_ids = [], []
+    for start in range(0, suppliers, batch_size):
+        documents = [supplier_document(i, rng) for i in range(start, min(start + batch_size, suppliers))]
+        db["sub_gold"].insert_many(documents)
+        supplier_ids += [document["System"]["ID"] for document in documents]
+    for start in range(0, products, batch_size):
+        documents = [product_document(i, rng) for i in range(start, min(start + batch_size, products))]
+        result = db["sub_gold_product"].insert_many(documents)
+        product_ids += [str(inserted_id) for inserted_id in result.inserted_ids]
+    return supplier_ids, product_ids
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--suppliers", type=int, default=5000)
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--reset", action="store_true", help="Replace benchmark collections that already hold documents")
+    args = parser.parse_args(argv)
+
+    try:
+        supplier_ids, product_ids = seed(MongoClient(args.mongo_uri), args.suppliers, args.products, reset=args.reset)
+    except ValueError as e:
+        sys.exit(str(e))
+    print(f"Seeded {len(supplier_ids)} suppliers and {len(product_ids)} products.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Local stand-in for the agent-call endpoint.
+
+Each POST picks random seeded records, appends them to the search's history
+document in chunks the way the agent does, then writes the `agent_log` entry
+the Search page waits for.
+"""
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from bench.seed import BENCH_SEARCH_DB, BENCH_AGENT_LOG_DB
+
+AGENT_PATH = "/agents/v1/agent/agent-call"
+
+
+class StubAgent:
+    """
+    Args:
+        client (MongoClient): A client of its own, so the stub's traffic is not
+            counted against the app under test.
+        supplier_ids (list): Seeded `System.ID`s to draw results from.
+        product_ids (list): Seeded product ObjectId strings to draw results from.
+        delay (float): Seconds of simulated agent work before the first result.
+        results (int): Number of results per search.
+        chunks (int): Number of writes the results are appended in.
+        blocking (bool): Respond only after `agent_log` is written, instead of straight away.
+    """
+
+    def __init__(self, client, supplier_ids, product_ids, delay=1.0, results=10, chunks=3, blocking=False, seed=7):
+        self.client = client
+        self.supplier_ids = supplier_ids
+        self.product_ids = product_ids
+        self.delay = delay
+        self.results = results
+        self.chunks = max(1, chunks)
+        self.blocking = blocking
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    def handle(self, payload):
+        search_id = payload["additional_config"]["search_id"]
+        thread_id = payload["thread_id"]
+        product = "product_search" in payload["message"]
+        with self._lock:
+            self.calls += 1
+            if product:
+                picked = self.rng.sample(self.product_ids, min(self.results, len(self.product_ids)))
+            else:
+                picked = self.rng.sample(self.supplier_ids, min(self.results, len(self.supplier_ids)))
+
+        query = re.search(r"- query: (.*)", payload["message"])
+        query = query.group(1) if query else ""
+        id_key = "uuid" if product else "supplier_ids"
+        results = [{id_key: record_id,
+                    "reason": f"Matches '{query}' on product range and order history.",
+                    "content": f"Record {record_id} " + "lorem ipsum " * 40,
+                    "score": round(0.99 - rank * 0.03, 2)} for rank, record_id in enumerate(picked)]
+
+        work = threading.Thread(target=self._write, args=(product, search_id, thread_id, query, results), daemon=True)
+        work.start()
+        if self.blocking:
+            work.join()
+        return {"status": "accepted", "thread_id": thread_id}
+
+    def _write(self, product, search_id, thread_id, query, results):
+        db = self.client[BENCH_SEARCH_DB]
+        history = db["product_search_history" if product else "supplier_search_history"]
+        time.sleep(self.delay)
+
+        history.insert_one({"search_id": search_id, "query": query, "created_at": datetime.utcnow(), "result": []})
+        chunk_size = -(-len(results) // self.chunks)
+        for start in range(0, len(results), chunk_size):
+            history.update_one({"search_id": search_id}, {"$push": {"result": {"$each": results[start:start + chunk_size]}}})
+            time.sleep(self.delay / (self.chunks * 4))
+
+        self.client[BENCH_AGENT_LOG_DB]["agent_log"].insert_one({
+            "thread_id": thread_id,
+            "ai_response": f"Found {len(results)} {'products' if product else 'suppliers'} matching '{query}'.",
+            "token_usage": {"prompt_tokens": 1800, "completion_tokens": 240, "total_tokens": 2040},
+            "created_at": datetime.utcnow(),
+        })
+
+    def start(self, host="127.0.0.1", port=0):
+        """Serves the stub from a daemon thread; returns the agent-call URL."""
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.path != AGENT_PATH:
+                    self.send_error(404)
+                    return
+                response = json.dumps(stub.handle(json.loads(body))).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(response)))
+                self.end_headers()
+                self.wfile.write(response)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="stub-agent", daemon=True).start()
+        return f"http://{host}:{self._server.server_address[1]}{AGENT_PATH}"
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
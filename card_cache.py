@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from pymongo.errors import PyMongoError
+
+CARD_CACHE_MAXSIZE = int(os.getenv("CARD_CACHE_MAXSIZE", 5000))
+CARD_CACHE_TTL = float(os.getenv("CARD_CACHE_TTL", 600))
+
+
+class CardCache:
+    """
+    Thread-safe TTL + LRU cache of projected card records, shared by all sessions.
+
+    Entries are keyed by the ID the agent returns (`System.ID` for suppliers,
+    the ObjectId string for products). The Mongo `_id` of each record is also
+    tracked so a change stream on the source collection can invalidate it.
+
+    Args:
+        maxsize (int): Maximum number of records kept; the least recently used is evicted.
+        ttl (float): Seconds a record stays valid after it was stored.
+    """
+
+    def __init__(self, maxsize=CARD_CACHE_MAXSIZE, ttl=CARD_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._keys_by_doc_id = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get_many(self, keys):
+        """
+        Looks up many keys at once.
+
+        Returns:
+            tuple[dict, list]: The cached records by key and the keys that missed.
+        """
+        found, missing = {}, []
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] < now:
+                    self._remove(key)
+                    self.expirations += 1
+                    entry = None
+                if entry is None:
+                    self.misses += 1
+                    missing.append(key)
+                    continue
+                self._entries.move_to_end(key)
+                self.hits += 1
+                found[key] = entry[1]
+        return found, missing
+
+    def put_many(self, records_by_key):
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for key, record in records_by_key.items():
+                if key in self._entries:
+                    self._remove(key)
+                self._entries[key] = (expires_at, record)
+                if "_id" in record:
+                    self._keys_by_doc_id[record["_id"]] = key
+            while len(self._entries) > self.maxsize:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate_doc_id(self, doc_id):
+        """Drops the record stored for the Mongo document `doc_id`, if any."""
+        with self._lock:
+            key = self._keys_by_doc_id.get(doc_id)
+            if key is not None and key in self._entries:
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_doc_id.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+    def _remove(self, key):
+        _, record = self._entries.pop(key)
+        if "_id" in record:
+            self._keys_by_doc_id.pop(record["_id"], None)
+
+
+def start_invalidation(cache, collection, retry_delay=30):
+    """
+    Invalidates cached records whenever their source document changes.
+
+    Runs a daemon thread with a change stream on `collection`. On deployments
+    without change streams the thread exits and the TTL alone bounds staleness.
+
+    Args:
+        cache (CardCache): The cache to invalidate.
+        collection: The source collection (`sub_gold` or `sub_gold_product`).
+        retry_delay (float): Seconds to wait before reopening a failed stream.
+
+    Returns:
+        threading.Thread: The watcher thread.
+    """
+    def watch():
+        pipeline = [{"$match": {"operationType": {"$in": ["update", "replace", "delete"]}}},
+                    {"$project": {"documentKey": 1}}]
+        while True:
+            try:
+                with collection.watch(pipeline) as stream:
+                    for change in stream:
+                        cache.invalidate_doc_id(change["documentKey"]["_id"])
+            except PyMongoError as e:
+                if "replica set" in str(e):
+                    return
+                # Anything may have changed while the stream was down
+                cache.clear()
+                time.sleep(retry_delay)
+
+    thread = threading.Thread(target=watch, name=f"card-cache-{collection.name}", daemon=True)
+    thread.start()
+    return thread
+
+
+supplier_card_cache = CardCache()
+product_card_cache = CardCache()
@@ -0,0 +1,178 @@
+"""
+Maintains compact card-summary collections next to `sub_gold` and `sub_gold_product`.
+
+Each summary document keeps the source `_id` and only the fields the result
+cards render, in the same nested shape, so the Search page can read cards
+from a few hundred bytes per record however large the gold records grow.
+
+Usage:
+    python card_summaries.py rebuild   # full rebuild from the source collections
+    python card_summaries.py sync      # rebuild if needed, then follow change streams
+"""
+import argparse
+import logging
+import sys
+import threading
+import time
+
+from pymongo import ASCENDING
+from pymongo.errors import OperationFailure, PyMongoError
+
+from connections import SEARCH_DB, get_mongo_client
+from records import SUPPLIER_CARD_PROJECTION, PRODUCT_CARD_PROJECTION
+
+logger = logging.getLogger(__name__)
+
+DB_NAME = SEARCH_DB
+STATE_COLLECTION = "card_summary_state"
+TOKEN_SAVE_INTERVAL = 60
+# ChangeStreamFatalError, ChangeStreamHistoryLost
+RESUME_FAILED_CODES = {280, 286}
+
+# (source collection, summary collection, projection, indexes on the summary)
+SUMMARIES = [
+    ("sub_gold", "sub_gold_card", SUPPLIER_CARD_PROJECTION, [[("System.ID", ASCENDING)]]),
+    ("sub_gold_product", "sub_gold_product_card", PRODUCT_CARD_PROJECTION, [[("product_id", ASCENDING)]]),
+]
+
+SUPPLIER_SUMMARY_COLLECTION = SUMMARIES[0][1]
+PRODUCT_SUMMARY_COLLECTION = SUMMARIES[1][1]
+
+
+def rebuild(client, source_name, summary_name, projection, indexes):
+    """
+    Rebuilds one summary collection from its source with a server-side `$project` + `$out`.
+
+    `$out` swaps the new collection in atomically and keeps the indexes of the
+    one it replaces, so readers never see a partial summary.
+
+    Returns:
+        int: The number of summary documents.
+    """
+    db = client[DB_NAME]
+    # Taken before the rebuild, so sync replays anything that changes during it
+    resume_token = _current_resume_token(db[source_name])
+    db[source_name].aggregate([{"$project": projection}, {"$out": summary_name}])
+    for keys in indexes:
+        db[summary_name].create_index(keys)
+    _save_resume_token(db, source_name, resume_token)
+    return db[summary_name].estimated_document_count()
+
+
+def rebuild_all(client):
+    """Rebuilds every summary collection; returns {summary collection: document count}."""
+    return {summary_name: rebuild(client, source_name, summary_name, projection, indexes)
+            for source_name, summary_name, projection, indexes in SUMMARIES}
+
+
+def _current_resume_token(collection):
+    try:
+        with collection.watch() as stream:
+            return stream.resume_token
+    except OperationFailure:
+        # Standalone server: no change streams, rebuilds only
+        return None
+
+
+def _save_resume_token(db, source_name, resume_token):
+    db[STATE_COLLECTION].update_one({"_id": source_name},
+                                    {"$set": {"resume_token": resume_token}},
+                                    upsert=True)
+
+
+def _apply_change(summary, change):
+    doc_id = change["documentKey"]["_id"]
+    if change["operationType"] == "delete":
+        summary.delete_one({"_id": doc_id})
+    elif change.get("fullDocument") is not None:
+        summary.replace_one({"_id": doc_id}, change["fullDocument"], upsert=True)
+
+
+def sync(client, source_name, summary_name, projection, indexes, stop_event=None, retry_delay=30):
+    """
+    Keeps one summary collection current from a change stream on its source.
+
+    Resumes from the token stored by the last rebuild or change; when there is
+    none, or the server no longer has it, the summary is rebuilt first.
+    Runs until `stop_event` is set.
+    """
+    db = client[DB_NAME]
+    # Project the changed document down to the card fields on the server
+    pipeline = [{"$match": {"operationType": {"$in": ["insert", "update", "replace", "delete"]}}},
+                {"$project": {"operationType": 1, "documentKey": 1,
+                              **{f"fullDocument.{field}": 1 for field in projection if field != "_id"}}}]
+    while stop_event is None or not stop_event.is_set():
+        state = db[STATE_COLLECTION].find_one({"_id": source_name}) or {}
+        if state.get("resume_token") is None:
+            rebuild(client, source_name, summary_name, projection, indexes)
+            state = db[STATE_COLLECTION].find_one({"_id": source_name}) or {}
+            if state.get("resume_token") is None:
+                logger.warning("Change streams are not available; %s is only updated by rebuilds.", summary_name)
+                return
+        resume_token, saved_at = state["resume_token"], time.monotonic()
+        try:
+            with db[source_name].watch(pipeline, full_document="updateLookup",
+                                       resume_after=resume_token, max_await_time_ms=1000) as stream:
+                while stream.alive and (stop_event is None or not stop_event.is_set()):
+                    change = stream.try_next()
+                    if change is not None:
+                        _apply_change(db[summary_name], change)
+                    # Persist progress after changes, and now and then while idle
+                    if stream.resume_token != resume_token and (change is not None or time.monotonic() - saved_at > TOKEN_SAVE_INTERVAL):
+                        resume_token, saved_at = stream.resume_token, time.monotonic()
+                        _save_resume_token(db, source_name, resume_token)
+        except OperationFailure as e:
+            if e.code not in RESUME_FAILED_CODES:
+                logger.warning("Card summary sync for %s failed (%s); retrying in %ss.", summary_name, e, retry_delay)
+                time.sleep(retry_delay)
+                continue
+            # The stored token fell off the oplog; start over from a rebuild
+            logger.warning("Cannot resume %s from its token (%s); rebuilding.", summary_name, e)
+            _save_resume_token(db, source_name, None)
+        except PyMongoError as e:
+            logger.warning("Card summary sync for %s failed (%s); retrying in %ss.", summary_name, e, retry_delay)
+            time.sleep(retry_delay)
+
+
+def start_sync(client, stop_event=None):
+    """
+    Runs `sync` for every summary collection on daemon threads.
+
+    Returns:
+        list[threading.Thread]: The sync threads.
+    """
+    threads = []
+    for source_name, summary_name, projection, indexes in SUMMARIES:
+        thread = threading.Thread(target=sync, args=(client, source_name, summary_name, projection, indexes, stop_event),
+                                  name=f"card-summary-{source_name}", daemon=True)
+        thread.start()
+        threads.append(thread)
+    return threads
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["rebuild", "sync"])
+    parser.add_argument("--mongo-env", default="POC_MONGOCONN", help="Environment variable holding the connection string")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    client = get_mongo_client(args.mongo_env)
+
+    if args.command == "rebuild":
+        for summary_name, count in rebuild_all(client).items():
+            print(f"{summary_name}: {count} documents")
+        return 0
+
+    stop_event = threading.Event()
+    threads = start_sync(client, stop_event)
+    try:
+        while any(thread.is_alive() for thread in threads):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        stop_event.set()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
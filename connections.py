@@ -0,0 +1,176 @@
+import os
+import threading
+
+import requests
+from azure.core.pipeline.transport import RequestsTransport
+from azure.storage.blob import BlobServiceClient
+from pymongo import MongoClient, monitoring
+from pymongo.errors import PyMongoError
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Pool sizes and timeouts, overridable per deployment
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 50))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 300000))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 5000))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 10000))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", 60000))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 10000))
+MONGO_HEARTBEAT_FREQUENCY_MS = int(os.getenv("MONGO_HEARTBEAT_FREQUENCY_MS", 10000))
+
+# Database names, overridable so the benchmarks never write to the real ones
+SEARCH_DB = os.getenv("SEARCH_DB", "search-agent")
+AGENT_LOG_DB = os.getenv("AGENT_LOG_DB", "ai-agent")
+
+BLOB_POOL_SIZE = int(os.getenv("BLOB_POOL_SIZE", 20))
+BLOB_CONNECTION_TIMEOUT = int(os.getenv("BLOB_CONNECTION_TIMEOUT", 10))
+BLOB_READ_TIMEOUT = int(os.getenv("BLOB_READ_TIMEOUT", 60))
+
+
+class ConnectionCounter(monitoring.ConnectionPoolListener):
+    """Counts the connections currently open across all pooled MongoClients."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.live = 0
+        self.peak = 0
+        self.created = 0
+        self.checked_out = 0
+
+    def connection_created(self, event):
+        with self._lock:
+            self.live += 1
+            self.created += 1
+            self.peak = max(self.peak, self.live)
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.live -= 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.checked_out += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        pass
+
+
+connection_counter = ConnectionCounter()
+
+_lock = threading.Lock()
+_mongo_clients = {}
+_blob_clients = {}
+
+
+def get_mongo_client(env_var: str = "POC_MONGOCONN") -> MongoClient:
+    """
+    Returns the process-wide MongoClient for the connection string in `env_var`.
+
+    The client is created on first use and shared by every session and page,
+    so Streamlit reruns reuse its connection pool instead of opening new ones.
+
+    Args:
+        env_var (str): The environment variable holding the connection string.
+
+    Returns:
+        MongoClient: The shared client.
+    """
+    client = _mongo_clients.get(env_var)
+    if client is not None:
+        return client
+
+    with _lock:
+        if env_var not in _mongo_clients:
+            _mongo_clients[env_var] = MongoClient(
+                os.getenv(env_var),
+                maxPoolSize=MONGO_MAX_POOL_SIZE,
+                minPoolSize=MONGO_MIN_POOL_SIZE,
+                maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+                connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+                serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+                waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+                heartbeatFrequencyMS=MONGO_HEARTBEAT_FREQUENCY_MS,
+                event_listeners=[connection_counter],
+            )
+        return _mongo_clients[env_var]
+
+
+def get_blob_service_client(env_var: str = "POC_BLOB_CONN") -> BlobServiceClient:
+    """
+    Returns the process-wide BlobServiceClient for the connection string in `env_var`.
+
+    The client shares one keep-alive HTTP session so uploads reuse TLS connections.
+
+    Args:
+        env_var (str): The environment variable holding the connection string.
+
+    Returns:
+        BlobServiceClient: The shared client.
+    """
+    client = _blob_clients.get(env_var)
+    if client is not None:
+        return client
+
+    with _lock:
+        if env_var not in _blob_clients:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=BLOB_POOL_SIZE, pool_maxsize=BLOB_POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            transport = RequestsTransport(session=session,
+                                          session_owner=False,
+                                          connection_timeout=BLOB_CONNECTION_TIMEOUT,
+                                          read_timeout=BLOB_READ_TIMEOUT)
+            _blob_clients[env_var] = BlobServiceClient.from_connection_string(os.getenv(env_var), transport=transport)
+        return _blob_clients[env_var]
+
+
+def check_health() -> dict:
+    """
+    Pings every pooled MongoClient and reports the pool state.
+
+    Returns:
+        dict: `mongo` maps each connection env var to True/False, alongside the
+        live, peak and checked-out connection counts.
+    """
+    mongo = {}
+    for env_var, client in list(_mongo_clients.items()):
+        try:
+            client.admin.command("ping")
+            mongo[env_var] = True
+        except PyMongoError:
+            mongo[env_var] = False
+
+    return {
+        "mongo": mongo,
+        "blob_clients": len(_blob_clients),
+        "live_connections": connection_counter.live,
+        "peak_connections": connection_counter.peak,
+        "checked_out_connections": connection_counter.checked_out,
+        "max_pool_size": MONGO_MAX_POOL_SIZE,
+    }
@@ -0,0 +1,219 @@
+"""
+Resolves extracted document titles to their document-type family without a model call.
+
+The configs list each family's synonyms: `doc_type_family` and
+`selected_fields` in `config.yaml` (under `inputs`) and `config_T4S.yaml`, and
+per-country `doc_family` and `key_fields` lists in `config_Air8.yaml`. A
+config is compiled once into a normalized index and reused until the file
+changes. A title that resolves to exactly one family skips LLM validation;
+anything unknown or ambiguous returns None and goes to the model as before.
+
+Usage:
+    python doc_types.py "CARGO RECEIPT No. 2231" --config config.yaml
+    python doc_types.py "Inovice" --config config_Air8.yaml --country China
+"""
+import argparse
+import difflib
+import os
+import re
+import sys
+import unicodedata
+from collections import namedtuple
+from functools import lru_cache
+
+import yaml
+
+# How close a misspelt title must be to a synonym, and how far ahead of the next family
+FUZZY_CUTOFF = 0.85
+FUZZY_MARGIN = 0.05
+CLASSIFY_CACHE_SIZE = 4096
+DEFAULT_COUNTRY = "General"
+
+_PUNCTUATION = re.compile(r"[^\w\s]", flags=re.UNICODE)
+_WHITESPACE = re.compile(r"\s+")
+# Document numbers and copy markings say nothing about the type
+_NOISE_TOKENS = {"no", "nr", "number", "copy", "original", "duplicate", "triplicate", "draft", "non", "negotiable"}
+
+DocTypeMatch = namedtuple("DocTypeMatch", ["family", "synonym", "method", "score"])
+
+
+def _singular(token):
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def normalize_title(title):
+    """
+    Folds case, punctuation, plurals, document numbers and copy markings.
+
+    "ORIGINAL Bill-of-Lading No. 2231" normalizes to "bill of lading".
+    """
+    text = unicodedata.normalize("NFKC", str(title or "")).casefold()
+    text = _PUNCTUATION.sub(" ", text)
+    tokens = [_singular(token) for token in _WHITESPACE.split(text)
+              if token and token not in _NOISE_TOKENS and not any(char.isdigit() for char in token)]
+    return " ".join(tokens)
+
+
+class DocTypeIndex:
+    """
+    Normalized synonym index of one config's document-type families.
+
+    Args:
+        families (dict): Family name -> list of synonyms, as in `doc_type_family`.
+        fields (dict, optional): Family name -> fields to extract, as in `selected_fields`.
+    """
+
+    def __init__(self, families, fields=None):
+        self.families = {family: list(synonyms or []) for family, synonyms in families.items()}
+        self.fields = {family: list(field_list or []) for family, field_list in (fields or {}).items()}
+        # normalized synonym -> {families it names}; a family's own name is a synonym too
+        self._exact = {}
+        for family, synonyms in self.families.items():
+            for synonym in [family, *synonyms]:
+                key = normalize_title(synonym)
+                if key:
+                    self._exact.setdefault(key, {})[family] = synonym
+        self._keys = list(self._exact)
+        # Longest first, so "certificate of business registration" is tried before "business registration"
+        self._phrases = sorted(self._keys, key=lambda key: -len(key.split()))
+        self.classify = lru_cache(maxsize=CLASSIFY_CACHE_SIZE)(self._classify)
+
+    def _unique(self, key, method, score):
+        families = self._exact[key]
+        if len(families) != 1:
+            return None
+        family, synonym = next(iter(families.items()))
+        return DocTypeMatch(family, synonym, method, score)
+
+    def _classify(self, title):
+        """
+        Resolves `title` to one family, or None when it is unknown or ambiguous.
+
+        Tries an exact match of the normalized title, then the synonyms the
+        title contains (multi-word ones, or a single word making up most of
+        the title), then a close misspelling.
+
+        Returns:
+            DocTypeMatch | None: The family, the synonym matched, the method
+            ('exact', 'contains' or 'fuzzy') and a similarity score.
+        """
+        key = normalize_title(title)
+        if not key:
+            return None
+        if key in self._exact:
+            return self._unique(key, "exact", 1.0)
+
+        padded = f" {key} "
+        contained = [phrase for phrase in self._phrases if f" {phrase} " in padded]
+        # "vat invoice" also contains "invoice"; only phrases not inside a longer match count
+        contained = [phrase for phrase in contained
+                     if not any(phrase != other and f" {phrase} " in f" {other} " for other in contained)]
+        if contained:
+            # A title naming two families ("Invoice and Packing List") is left to the model
+            families = {family for phrase in contained for family in self._exact[phrase]}
+            if len(families) != 1:
+                return None
+            # A one-word synonym only settles it when it is most of the title: "Proforma Invoice",
+            # "Copy of Invoice" and "Contract Termination Notice" are not that family
+            tokens = len(key.split())
+            decisive = [phrase for phrase in contained if " " in phrase or 2 * len(phrase.split()) > tokens]
+            if decisive:
+                return self._unique(decisive[0], "contains", 1.0)
+
+        # Best score per family, so two synonyms of one family are not a tie. Phrases
+        # that cannot come within the margin of the cutoff are skipped on cheap upper bounds.
+        floor = FUZZY_CUTOFF - FUZZY_MARGIN
+        matcher = difflib.SequenceMatcher(None, b=key)
+        best = {}
+        for phrase in self._keys:
+            matcher.set_seq1(phrase)
+            if matcher.real_quick_ratio() < floor or matcher.quick_ratio() < floor:
+                continue
+            score = matcher.ratio()
+            for family in self._exact[phrase]:
+                if score > best.get(family, (0.0, None))[0]:
+                    best[family] = (score, phrase)
+        ranked = sorted(best.items(), key=lambda item: -item[1][0])
+        if not ranked or ranked[0][1][0] < FUZZY_CUTOFF:
+            return None
+        if len(ranked) > 1 and ranked[0][1][0] - ranked[1][1][0] < FUZZY_MARGIN:
+            return None
+        family, (score, phrase) = ranked[0]
+        return DocTypeMatch(family, self._exact[phrase][family], "fuzzy", round(score, 3))
+
+    def fields_for(self, family):
+        """The fields to extract for `family`, from `selected_fields` or `key_fields`."""
+        return self.fields.get(family, [])
+
+
+def _families_from_config(config, country):
+    if "doc_type_family" in (config.get("inputs") or {}):
+        config = config["inputs"]
+    if "doc_type_family" in config:
+        return config["doc_type_family"] or {}, config.get("selected_fields") or {}
+
+    # Per-country layout: {country: {doc type: {doc_family: [...], key_fields: [...]}}}
+    countries = [name for name, section in config.items()
+                 if isinstance(section, dict) and any(isinstance(doc, dict) and "doc_family" in doc for doc in section.values())]
+    if not countries:
+        raise ValueError("The config has no doc_type_family or per-country doc_family lists.")
+    country = country or (DEFAULT_COUNTRY if DEFAULT_COUNTRY in countries else None)
+    if country not in countries:
+        raise ValueError(f"Pick a country for this config: {', '.join(countries)}.")
+    section = {doc_type: doc for doc_type, doc in config[country].items() if isinstance(doc, dict)}
+    return ({doc_type: doc.get("doc_family") for doc_type, doc in section.items()},
+            {doc_type: doc.get("key_fields") for doc_type, doc in section.items()})
+
+
+@lru_cache(maxsize=16)
+def _compile(path, mtime_ns, country):
+    with open(path, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f) or {}
+    return DocTypeIndex(*_families_from_config(config, country))
+
+
+def load_index(config_path="config.yaml", country=None):
+    """
+    Returns the compiled index of a config, parsing the YAML only when the file has changed.
+
+    Args:
+        config_path (str): `config.yaml`, `config_T4S.yaml` or `config_Air8.yaml`.
+        country (str, optional): Section of a per-country config; 'General' by default.
+
+    Returns:
+        DocTypeIndex: Shared by every caller until the file's modification time changes.
+    """
+    path = os.path.abspath(config_path)
+    return _compile(path, os.stat(path).st_mtime_ns, country)
+
+
+def classify_title(title, config_path="config.yaml", country=None):
+    """Shortcut for `load_index(config_path, country).classify(title)`."""
+    return load_index(config_path, country).classify(title)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("titles", nargs="+", help="Document titles to classify")
+    parser.add_argument("--config", default="config.yaml")
+    parser.add_argument("--country", help="Country section of a per-country config")
+    args = parser.parse_args(argv)
+
+    index = load_index(args.config, args.country)
+    for title in args.titles:
+        match = index.classify(title)
+        if match is None:
+            print(f"{title!r}: unresolved, needs the model")
+            continue
+        print(f"{title!r}: {match.family} (via {match.method} match on {match.synonym!r}, score {match.score})")
+        for field in index.fields_for(match.family):
+            print(f"    - {field}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+"""
+Exports the full result list of a search, joined with the card fields of each match.
+
+The join runs on the server (`$unwind` of the stored `result` list, then a
+`$lookup` into `sub_gold` or `sub_gold_product` projected to the card fields)
+and rows are written as the cursor delivers them, in chunks, so memory stays
+flat however many results a search has. No cards are rendered.
+
+Usage:
+    python export.py <search_id> --kind supplier --output results.csv
+    python export.py <search_id> --kind product --format parquet --output results.parquet
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+
+from connections import SEARCH_DB, get_mongo_client
+from records import SUPPLIER_CARD_PROJECTION, PRODUCT_CARD_PROJECTION
+from search_history import fetch_result_scores
+
+DB_NAME = SEARCH_DB
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+FORMATS = ["csv", "parquet"]
+
+# Per kind: where results and records live, how a result names its record, and the card columns
+EXPORTS = {
+    "supplier": {
+        "history": "supplier_search_history",
+        "records": "sub_gold",
+        "id_key": "supplier_ids",
+        "key": "$result.supplier_ids",
+        "foreign_field": "System.ID",
+        "projection": SUPPLIER_CARD_PROJECTION,
+        "columns": [("supplier_name", "SupplierBasic.Demographics.EntityFullName"),
+                    ("country", "SupplierBasic.Demographics.RegistrationCountry"),
+                    ("year_established", "SupplierBasic.Demographics.YearEstablished"),
+                    ("headquarter_address", "SupplierBasic.Demographics.HeadquarterAddress")],
+    },
+    "product": {
+        "history": "product_search_history",
+        "records": "sub_gold_product",
+        "id_key": "uuid",
+        # Results name products by ObjectId string; anything else simply finds no record
+        "key": {"$convert": {"input": "$result.uuid", "to": "objectId", "onError": None, "onNull": None}},
+        "foreign_field": "_id",
+        "projection": PRODUCT_CARD_PROJECTION,
+        "columns": [("product_id", "product_id"),
+                    ("item_description", "item_description"),
+                    ("product_family", "product_family"),
+                    ("product_category", "product_category"),
+                    ("has_image", "has_image"),
+                    ("image_url", "image_url")],
+    },
+}
+
+
+def export_columns(kind, include_content=False):
+    """The column order of an export."""
+    columns = ["rank", "id", "score", "score_pct", "reason", *[column for column, _ in EXPORTS[kind]["columns"]]]
+    return columns + ["content"] if include_content else columns
+
+
+def export_pipeline(kind, search_id, max_score=None, include_content=False):
+    """
+    Builds the aggregation that yields one flat row per result, in ranking order.
+
+    Args:
+        kind (str): 'supplier' or 'product'.
+        search_id (str): The search to export.
+        max_score (float, optional): Top score, for the percentage shown on the cards.
+        include_content (bool): Also export each result's raw agent output.
+
+    Returns:
+        list: The pipeline, to run on the search-history collection.
+    """
+    spec = EXPORTS[kind]
+    row = {"_id": 0,
+           "rank": {"$add": ["$rank", 1]},
+           "id": f"$result.{spec['id_key']}",
+           "score": "$result.score",
+           "reason": "$result.reason"}
+    if max_score:
+        row["score_pct"] = {"$round": [{"$multiply": [{"$divide": [{"$ifNull": ["$result.score", 0]}, max_score]}, 100]}, 1]}
+    for column, path in spec["columns"]:
+        row[column] = {"$arrayElemAt": [f"$card.{path}", 0]}
+    if include_content:
+        row["content"] = "$result.content"
+
+    return [
+        {"$match": {"search_id": search_id}},
+        {"$limit": 1},
+        {"$project": {"_id": 0, "result": 1}},
+        {"$unwind": {"path": "$result", "includeArrayIndex": "rank"}},
+        {"$addFields": {"card_key": spec["key"]}},
+        {"$lookup": {"from": spec["records"],
+                     "localField": "card_key",
+                     "foreignField": spec["foreign_field"],
+                     "pipeline": [{"$limit": 1}, {"$project": spec["projection"]}],
+                     "as": "card"}},
+        {"$project": row},
+    ]
+
+
+def iter_export_rows(db, kind, search_id, include_content=False, batch_size=EXPORT_BATCH_SIZE):
+    """Yields the export rows of a search straight from the aggregation cursor."""
+    scores = fetch_result_scores(db[EXPORTS[kind]["history"]], search_id)
+    max_score = max(scores) if scores else None
+    pipeline = export_pipeline(kind, search_id, max_score=max_score or None, include_content=include_content)
+    with db[EXPORTS[kind]["history"]].aggregate(pipeline, allowDiskUse=True, batchSize=batch_size) as cursor:
+        yield from cursor
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def write_csv(rows, output, columns):
+    """
+    Writes rows to a text stream as CSV.
+
+    Returns:
+        int: The number of rows written.
+    """
+    writer = csv.DictWriter(output, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def write_parquet(rows, output, columns, chunk_size=EXPORT_BATCH_SIZE):
+    """
+    Writes rows to a path or binary stream as Parquet, one row group per chunk.
+
+    Card fields are written as strings, since records do not agree on their types.
+
+    Returns:
+        int: The number of rows written.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    numeric = {"rank": pa.int64(), "score": pa.float64(), "score_pct": pa.float64()}
+    schema = pa.schema([(column, numeric.get(column, pa.string())) for column in columns])
+    count = 0
+    with pq.ParquetWriter(output, schema) as writer:
+        for chunk in _chunks(rows, chunk_size):
+            data = {column: [row.get(column) for row in chunk] for column in columns}
+            for column, values in data.items():
+                if column not in numeric:
+                    data[column] = [None if value is None else str(value) for value in values]
+                elif column != "rank":
+                    data[column] = [None if value is None else float(value) for value in values]
+            writer.write_table(pa.table(data, schema=schema))
+            count += len(chunk)
+    return count
+
+
+def export_search(db, kind, search_id, output, file_format="csv", include_content=False, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Streams a search's full results, joined with their card fields, into `output`.
+
+    Args:
+        db: The search database (`SEARCH_DB`).
+        kind (str): 'supplier' or 'product'.
+        search_id (str): The search to export.
+        output: A binary stream.
+        file_format (str): 'csv' or 'parquet'.
+        include_content (bool): Also export each result's raw agent output.
+        batch_size (int): Rows per cursor batch and Parquet row group.
+
+    Returns:
+        int: The number of rows written.
+    """
+    columns = export_columns(kind, include_content)
+    rows = iter_export_rows(db, kind, search_id, include_content, batch_size)
+    if file_format == "parquet":
+        return write_parquet(rows, output, columns, batch_size)
+
+    text = io.TextIOWrapper(output, encoding="utf-8", newline="", write_through=True)
+    try:
+        return write_csv(rows, text, columns)
+    finally:
+        # Leave `output` open for the caller
+        text.detach()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("search_id")
+    parser.add_argument("--kind", choices=list(EXPORTS), required=True)
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--output", required=True, help="File to write")
+    parser.add_argument("--content", action="store_true", help="Include each result's raw agent output")
+    parser.add_argument("--mongo-env", default="POC_MONGOCONN", help="Environment variable holding the connection string")
+    args = parser.parse_args(argv)
+
+    db = get_mongo_client(args.mongo_env)[DB_NAME]
+    with open(args.output, "wb") as f:
+        count = export_search(db, args.kind, args.search_id, f, args.format, include_content=args.content)
+    print(f"Wrote {count} rows to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+import logging
+import re
+
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+
+from query_cache import normalize_query
+from records import SUPPLIER_CARD_PROJECTION, PRODUCT_CARD_PROJECTION
+
+# A single token with at least one digit, e.g. "S12345" or "100234"
+ID_PATTERN = re.compile(r"^(?=[^\s]*\d)[\w\-./]{1,40}$")
+OBJECT_ID_PATTERN = re.compile(r"^[0-9a-fA-F]{24}$")
+MAX_NAME_LENGTH = 120
+TEXT_CANDIDATES = 50
+# The error a $text query gets on a collection without a text index
+INDEX_NOT_FOUND = 27
+
+logger = logging.getLogger(__name__)
+
+# Set once a collection is found to have no text index, to stop retrying
+_collections_without_text_index = set()
+
+
+def _strip_query(query):
+    return (query or "").strip().strip("\"'")
+
+
+def _id_variants(token):
+    variants = {token, token.upper()}
+    if token.isdigit():
+        variants.add(int(token))
+    return list(variants)
+
+
+def _exact_name_matches(collection, name, projection, name_of):
+    """Text-index lookup narrowed to records whose normalized name equals `name`."""
+    key = (collection.database.name, collection.name)
+    if key in _collections_without_text_index:
+        return []
+
+    phrase = name.replace('"', " ")
+    try:
+        cursor = collection.find({"$text": {"$search": f'"{phrase}"'}},
+                                 {**projection, "score": {"$meta": "textScore"}})
+        candidates = list(cursor.sort([("score", {"$meta": "textScore"})]).limit(TEXT_CANDIDATES))
+    except OperationFailure as e:
+        if e.code == INDEX_NOT_FOUND:
+            _collections_without_text_index.add(key)
+        else:
+            # Interrupted, timed out or mid-failover: skip this lookup, try again next time
+            logger.warning("Name lookup on %s.%s failed: %s", *key, e)
+        return []
+
+    target = normalize_query(name)
+    matches = [record for record in candidates if normalize_query(name_of(record)) == target]
+    for record in matches:
+        record.pop("score", None)
+    return matches
+
+
+def _supplier_name(record):
+    return record.get("SupplierBasic", {}).get("Demographics", {}).get("EntityFullName", "")
+
+
+def _product_name(record):
+    return record.get("item_description", "")
+
+
+def _as_results(records, id_of, id_key, reason):
+    return [{id_key: id_of(record), "reason": reason, "content": "", "score": 1.0} for record in records]
+
+
+def lookup_suppliers(collection, query, cache=None):
+    """
+    Answers plain supplier lookups (a supplier ID or an exact company name) from `sub_gold`.
+
+    Args:
+        collection: The supplier collection.
+        query (str): The user's query.
+        cache (CardCache, optional): Primed with the records found.
+
+    Returns:
+        list | None: Result entries shaped like `supplier_search_history.result`,
+        or None when the query is not a plain lookup or nothing matched.
+    """
+    query = _strip_query(query)
+    if not query or len(query) > MAX_NAME_LENGTH:
+        return None
+
+    records, reason = [], None
+    if ID_PATTERN.match(query):
+        records = list(collection.find({"System.ID": {"$in": _id_variants(query)}}, SUPPLIER_CARD_PROJECTION))
+        reason = f"Supplier ID matches '{query}'."
+    if not records:
+        records = _exact_name_matches(collection, query, SUPPLIER_CARD_PROJECTION, _supplier_name)
+        reason = f"Supplier name matches '{query}'."
+    if not records:
+        return None
+
+    if cache is not None:
+        cache.put_many({record["System"]["ID"]: record for record in records})
+    return _as_results(records, lambda record: record["System"]["ID"], "supplier_ids", reason)
+
+
+def lookup_products(collection, query, cache=None):
+    """
+    Answers plain product lookups (a record ObjectId, a product ID or an exact
+    item description) from `sub_gold_product`.
+
+    Args:
+        collection: The product collection.
+        query (str): The user's query.
+        cache (CardCache, optional): Primed with the records found.
+
+    Returns:
+        list | None: Result entries shaped like `product_search_history.result`,
+        or None when the query is not a plain lookup or nothing matched.
+    """
+    query = _strip_query(query)
+    if not query or len(query) > MAX_NAME_LENGTH:
+        return None
+
+    records, reason = [], None
+    if OBJECT_ID_PATTERN.match(query):
+        records = list(collection.find({"_id": ObjectId(query)}, PRODUCT_CARD_PROJECTION))
+        reason = f"Record ID matches '{query}'."
+    if not records and ID_PATTERN.match(query):
+        records = list(collection.find({"product_id": {"$in": _id_variants(query)}}, PRODUCT_CARD_PROJECTION))
+        reason = f"Product ID matches '{query}'."
+    if not records:
+        records = _exact_name_matches(collection, query, PRODUCT_CARD_PROJECTION, _product_name)
+        reason = f"Product description matches '{query}'."
+    if not records:
+        return None
+
+    if cache is not None:
+        cache.put_many({str(record["_id"]): record for record in records})
+    return _as_results(records, lambda record: str(record["_id"]), "uuid", reason)
@@ -0,0 +1,181 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, Union
+from urllib.parse import unquote, urlparse
+
+from azure.storage.blob import BlobServiceClient, generate_blob_sas, BlobSasPermissions
+from PIL import Image, ImageOps
+
+try:
+    from pillow_heif import register_heif_opener
+    register_heif_opener()
+except ImportError:
+    pass
+
+IMAGE_MAX_SIZE = int(os.getenv("IMAGE_MAX_SIZE", 1024))
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", 85))
+SAS_VALIDITY = timedelta(days=365)
+SAS_REFRESH_MARGIN = timedelta(days=1)
+# Blobs known to exist and SAS tokens kept per process, least recently used dropped first
+UPLOAD_CACHE_MAXSIZE = int(os.getenv("UPLOAD_CACHE_MAXSIZE", 10000))
+
+_lock = threading.Lock()
+_known_containers = set()
+_known_blobs = OrderedDict()
+_sas_tokens = OrderedDict()
+
+
+def _remember(cache, key, value=None):
+    # Callers hold _lock
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > UPLOAD_CACHE_MAXSIZE:
+        cache.popitem(last=False)
+
+
+def _recall(cache, key):
+    with _lock:
+        if key not in cache:
+            return False, None
+        cache.move_to_end(key)
+        return True, cache[key]
+
+
+def prepare_image(data: bytes, max_size: int = IMAGE_MAX_SIZE, quality: int = IMAGE_JPEG_QUALITY) -> bytes:
+    """
+    Downscales an image so its longest side is at most `max_size` and re-encodes it as JPEG.
+
+    A JPEG that is already small enough is returned unchanged.
+
+    Args:
+        data (bytes): The uploaded image.
+        max_size (int): Maximum width and height in pixels.
+        quality (int): JPEG quality used for re-encoding.
+
+    Returns:
+        bytes: The JPEG to upload.
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        if image.format == "JPEG" and max(image.size) <= max_size:
+            return data
+
+        image = ImageOps.exif_transpose(image)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        image.thumbnail((max_size, max_size), Image.LANCZOS)
+
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=quality, optimize=True)
+        return output.getvalue()
+
+
+def _ensure_container(blob_service_client: BlobServiceClient, container_name: str):
+    # Checked once per process; the container is never deleted by the app
+    key = (blob_service_client.account_name, container_name)
+    if key in _known_containers:
+        return
+    container_client = blob_service_client.get_container_client(container_name)
+    if not container_client.exists():
+        container_client.create_container()
+    with _lock:
+        _known_containers.add(key)
+
+
+def _get_sas_token(blob_service_client: BlobServiceClient, container_name: str, blob_name: str) -> str:
+    key = (blob_service_client.account_name, container_name, blob_name)
+    now = datetime.utcnow()
+    _, cached = _recall(_sas_tokens, key)
+    if cached is not None and cached[1] - now > SAS_REFRESH_MARGIN:
+        return cached[0]
+
+    expiry = now + SAS_VALIDITY
+    sas_token = generate_blob_sas(
+        account_name=blob_service_client.account_name,
+        container_name=container_name,
+        blob_name=blob_name,
+        account_key=blob_service_client.credential.account_key,
+        permission=BlobSasPermissions(read=True),
+        expiry=expiry
+    )
+    with _lock:
+        _remember(_sas_tokens, key, (sas_token, expiry))
+    return sas_token
+
+
+def signed_blob_url(blob_url: str, blob_service_client: BlobServiceClient) -> str:
+    """
+    Returns `blob_url` with a current read SAS signed by `blob_service_client`'s account key.
+
+    Any query string already on the URL is dropped. URLs of another storage
+    account cannot be signed here and are returned without one.
+    """
+    url = blob_url.split("?", 1)[0]
+    parsed = urlparse(url)
+    if parsed.netloc.split(".", 1)[0] != blob_service_client.account_name:
+        return url
+    container_name, _, blob_name = unquote(parsed.path.lstrip("/")).partition("/")
+    if not blob_name:
+        return url
+    return f"{url}?{_get_sas_token(blob_service_client, container_name, blob_name)}"
+
+
+def upload_blob_and_get_url(container_name: str,
+                            blob_name: str,
+                            data: Union[bytes, str, Callable[[], bytes]],
+                            blob_service_client: BlobServiceClient,
+                            skip_if_exists: bool = False) -> str:
+    """
+    Uploads a blob to Azure Blob Storage and returns a public URL.
+
+    Args:
+        container_name (str): The name of the container to upload to.
+        blob_name (str): The name to give the blob in storage.
+        data (Union[bytes, str, callable]): The content to upload, or a function
+            returning it, called only when an upload is needed.
+        blob_service_client (BlobServiceClient): The BlobServiceClient instance.
+        skip_if_exists (bool): Reuse an existing blob of the same name instead of
+            uploading again. Only safe for content-addressed names.
+
+    Returns:
+        str: The public URL of the uploaded blob.
+    """
+    try:
+        _ensure_container(blob_service_client, container_name)
+
+        blob_client = blob_service_client.get_blob_client(container_name, blob_name)
+        blob_key = (blob_service_client.account_name, container_name, blob_name)
+        if not (skip_if_exists and (_recall(_known_blobs, blob_key)[0] or blob_client.exists())):
+            blob_client.upload_blob(data() if callable(data) else data, overwrite=True)
+        with _lock:
+            _remember(_known_blobs, blob_key)
+
+        sas_token = _get_sas_token(blob_service_client, container_name, blob_name)
+
+        # Construct the full URL
+        return f"{blob_client.url}?{sas_token}"
+
+    except Exception as e:
+        # Handle exceptions and provide a meaningful error message
+        raise RuntimeError(f"An error occurred while uploading the blob: {str(e)}")
+
+
+def upload_search_image(data: bytes, container_name: str, blob_service_client: BlobServiceClient, prefix: str = "product_search_") -> str:
+    """
+    Downscales an uploaded search image and stores it under a content-hash name.
+
+    The name is the hash of the uploaded bytes, so re-searching with the same
+    photo finds the existing blob before the image is decoded or re-encoded.
+
+    Returns:
+        str: The SAS URL of the stored image.
+    """
+    blob_name = f"{prefix}{hashlib.sha256(data).hexdigest()}.jpeg"
+    return upload_blob_and_get_url(container_name=container_name,
+                                   blob_name=blob_name,
+                                   data=lambda: prepare_image(data),
+                                   blob_service_client=blob_service_client,
+                                   skip_if_exists=True)
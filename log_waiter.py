@@ -0,0 +1,190 @@
+import threading
+import time
+from collections import deque
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+# Error code returned by standalone mongod when $changeStream is requested
+CHANGE_STREAM_UNSUPPORTED = 40573
+
+
+class _Slot:
+    """A single caller waiting for the log entry of one thread_id."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.log = None
+
+
+class LogWaiter:
+    """
+    Delivers `agent_log` entries to waiting searches as soon as they are written.
+
+    One change stream over the collection is shared by every session in the
+    process; entries are dispatched to waiters by `thread_id`. When change
+    streams are not available (standalone mongod) callers fall back to polling
+    with an adaptive backoff instead of a fixed interval.
+
+    Args:
+        collection: The `agent_log` collection.
+        mode (str): 'auto' (stream, falling back to polling), 'stream' or 'poll'.
+        min_poll_interval (float): First polling delay in seconds.
+        max_poll_interval (float): Upper bound of the polling delay in seconds.
+        backoff (float): Factor applied to the polling delay after each miss.
+    """
+
+    def __init__(self, collection, mode="auto", min_poll_interval=0.1, max_poll_interval=2.0, backoff=1.5):
+        self.collection = collection
+        self.mode = mode
+        self.min_poll_interval = min_poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.backoff = backoff
+
+        self._lock = threading.Lock()
+        self._slots = {}
+        self._watcher = None
+        self._stream_ready = threading.Event()
+        self._stream_unsupported = mode == "poll"
+        self._timings = {"stream": deque(maxlen=500), "poll": deque(maxlen=500)}
+
+    def wait(self, thread_id, timeout=60, cancel_event=None):
+        """
+        Blocks until the log entry for `thread_id` exists or `timeout` expires.
+
+        Args:
+            thread_id (str): The agent thread to wait for.
+            timeout (float): Maximum number of seconds to wait.
+            cancel_event (threading.Event, optional): Stops the wait early when set.
+
+        Returns:
+            dict | None: The log entry, or None on timeout or cancellation.
+        """
+        start = time.monotonic()
+        deadline = start + timeout
+
+        log = None
+        mode = "poll"
+        if self._stream_available(deadline):
+            mode = "stream"
+            log = self._wait_stream(thread_id, deadline, cancel_event)
+
+        # The stream may have failed mid-wait; use whatever time is left
+        if log is None and not self._cancelled(cancel_event) and time.monotonic() < deadline:
+            mode = "poll"
+            log = self._wait_poll(thread_id, deadline, cancel_event)
+
+        if log is not None:
+            self._timings[mode].append(time.monotonic() - start)
+        return log
+
+    def stats(self):
+        """Returns time-to-result statistics (in seconds) for each delivery mode."""
+        summary = {}
+        for mode, timings in self._timings.items():
+            values = sorted(timings)
+            if not values:
+                summary[mode] = {"count": 0}
+                continue
+            summary[mode] = {
+                "count": len(values),
+                "mean": sum(values) / len(values),
+                "p95": values[min(len(values) - 1, int(len(values) * 0.95))],
+                "max": values[-1],
+                "last": timings[-1],
+            }
+        summary["active_mode"] = "poll" if self._stream_unsupported else "stream"
+        summary["waiting"] = sum(len(slots) for slots in self._slots.values())
+        return summary
+
+    @staticmethod
+    def _cancelled(cancel_event):
+        return cancel_event is not None and cancel_event.is_set()
+
+    def _stream_available(self, deadline):
+        if self._stream_unsupported:
+            return False
+        watcher = self._ensure_watcher()
+        # Give a freshly started watcher a moment to open its cursor
+        limit = min(deadline, time.monotonic() + 2.0)
+        while not self._stream_ready.is_set() and watcher.is_alive() and time.monotonic() < limit:
+            self._stream_ready.wait(timeout=0.05)
+        return self._stream_ready.is_set() and not self._stream_unsupported
+
+    def _wait_stream(self, thread_id, deadline, cancel_event):
+        slot = _Slot()
+        with self._lock:
+            self._slots.setdefault(thread_id, []).append(slot)
+        try:
+            # Catch entries written before this waiter was registered
+            log = self.collection.find_one({"thread_id": thread_id})
+            if log is not None:
+                return log
+            while not slot.event.is_set() and not self._cancelled(cancel_event):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._stream_ready.is_set():
+                    break
+                slot.event.wait(timeout=min(remaining, 0.5))
+            return slot.log
+        finally:
+            with self._lock:
+                slots = self._slots.get(thread_id, [])
+                if slot in slots:
+                    slots.remove(slot)
+                if not slots:
+                    self._slots.pop(thread_id, None)
+
+    def _wait_poll(self, thread_id, deadline, cancel_event):
+        interval = self.min_poll_interval
+        while not self._cancelled(cancel_event):
+            log = self.collection.find_one({"thread_id": thread_id})
+            if log is not None:
+                return log
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            time.sleep(min(interval, remaining))
+            interval = min(interval * self.backoff, self.max_poll_interval)
+        return None
+
+    def _ensure_watcher(self):
+        with self._lock:
+            if self._watcher is None or not self._watcher.is_alive():
+                self._stream_ready.clear()
+                self._watcher = threading.Thread(target=self._watch, name="agent-log-watcher", daemon=True)
+                self._watcher.start()
+            return self._watcher
+
+    def _watch(self):
+        pipeline = [
+            {"$match": {"operationType": {"$in": ["insert", "replace", "update"]},
+                        "fullDocument.thread_id": {"$exists": True}}},
+        ]
+        try:
+            with self.collection.watch(pipeline, full_document="updateLookup") as stream:
+                self._stream_ready.set()
+                for change in stream:
+                    self._deliver(change.get("fullDocument"))
+        except OperationFailure as e:
+            if e.code == CHANGE_STREAM_UNSUPPORTED or "replica set" in str(e):
+                self._stream_unsupported = True
+        except PyMongoError:
+            # Non-resumable failure; the next wait() starts a new watcher
+            pass
+        finally:
+            self._stream_ready.clear()
+            self._wake_all()
+
+    def _deliver(self, doc):
+        if not doc:
+            return
+        with self._lock:
+            slots = list(self._slots.get(doc.get("thread_id"), []))
+        for slot in slots:
+            slot.log = doc
+            slot.event.set()
+
+    def _wake_all(self):
+        with self._lock:
+            slots = [slot for slots in self._slots.values() for slot in slots]
+        for slot in slots:
+            slot.event.set()
@@ -0,0 +1,160 @@
+"""
+Creates the indexes behind the Search page's hot queries and audits their plans.
+
+Usage:
+    python manage_indexes.py               # create missing indexes, then audit
+    python manage_indexes.py --check-only  # audit only
+
+Exits with status 1 when any hot query shape is planned as a COLLSCAN, or
+cannot be verified because its collection is missing or empty.
+"""
+import argparse
+import sys
+from datetime import datetime
+
+from pymongo import ASCENDING, DESCENDING, TEXT
+from pymongo.errors import OperationFailure
+
+from connections import SEARCH_DB, AGENT_LOG_DB, get_mongo_client
+from records import SUPPLIER_CARD_PROJECTION, PRODUCT_CARD_PROJECTION
+
+# Audit outcomes
+OK = "ok"
+UNVERIFIED = "warn"
+FAILED = "FAIL"
+
+# (database, collection, keys, options)
+INDEXES = [
+    (AGENT_LOG_DB, "agent_log", [("thread_id", ASCENDING)], {}),
+    (SEARCH_DB, "supplier_search_history", [("search_id", ASCENDING)], {}),
+    (SEARCH_DB, "supplier_search_history", [("normalized_query", ASCENDING), ("cached_at", DESCENDING)], {}),
+    (SEARCH_DB, "product_search_history", [("search_id", ASCENDING)], {}),
+    (SEARCH_DB, "product_search_history", [("normalized_query", ASCENDING), ("cached_at", DESCENDING)], {}),
+    (SEARCH_DB, "sub_gold", [("System.ID", ASCENDING)], {}),
+    (SEARCH_DB, "sub_gold", [("SupplierBasic.Demographics.EntityFullName", TEXT)], {"default_language": "none"}),
+    (SEARCH_DB, "sub_gold_product", [("product_id", ASCENDING)], {}),
+    (SEARCH_DB, "sub_gold_product", [("item_description", TEXT)], {"default_language": "none"}),
+    (SEARCH_DB, "sub_gold_card", [("System.ID", ASCENDING)], {}),
+    (SEARCH_DB, "sub_gold_product_card", [("product_id", ASCENDING)], {}),
+]
+
+# (label, database, collection, filter, projection, sort)
+HOT_QUERIES = [
+    ("agent_log by thread_id", AGENT_LOG_DB, "agent_log",
+     {"thread_id": "audit"}, None, None),
+    ("supplier history by search_id", SEARCH_DB, "supplier_search_history",
+     {"search_id": "audit"}, {"result": {"$slice": [0, 10]}}, None),
+    ("product history by search_id", SEARCH_DB, "product_search_history",
+     {"search_id": "audit"}, {"result": {"$slice": [0, 10]}}, None),
+    ("supplier query cache", SEARCH_DB, "supplier_search_history",
+     {"normalized_query": "audit", "cached_at": {"$gte": datetime(2000, 1, 1)}, "result.0": {"$exists": True}},
+     None, [("cached_at", DESCENDING)]),
+    ("product query cache", SEARCH_DB, "product_search_history",
+     {"normalized_query": "audit", "cached_at": {"$gte": datetime(2000, 1, 1)}, "result.0": {"$exists": True}},
+     None, [("cached_at", DESCENDING)]),
+    ("supplier cards by System.ID", SEARCH_DB, "sub_gold",
+     {"System.ID": {"$in": ["audit-1", "audit-2"]}}, SUPPLIER_CARD_PROJECTION, None),
+    ("supplier card summaries by System.ID", SEARCH_DB, "sub_gold_card",
+     {"System.ID": {"$in": ["audit-1", "audit-2"]}}, SUPPLIER_CARD_PROJECTION, None),
+    ("supplier name lookup", SEARCH_DB, "sub_gold",
+     {"$text": {"$search": '"audit"'}}, SUPPLIER_CARD_PROJECTION, None),
+    ("product lookup by product_id", SEARCH_DB, "sub_gold_product",
+     {"product_id": {"$in": ["audit-1"]}}, PRODUCT_CARD_PROJECTION, None),
+    ("product description lookup", SEARCH_DB, "sub_gold_product",
+     {"$text": {"$search": '"audit"'}}, PRODUCT_CARD_PROJECTION, None),
+]
+
+
+def ensure_indexes(client):
+    """
+    Creates every index in INDEXES; indexes that already exist are left alone.
+
+    Returns:
+        list: (namespace, index name or error message, created) per index.
+    """
+    report = []
+    for db_name, collection_name, keys, options in INDEXES:
+        collection = client[db_name][collection_name]
+        namespace = f"{db_name}.{collection_name}"
+        try:
+            name = collection.create_index(keys, **options)
+            report.append((namespace, name, True))
+        except OperationFailure as e:
+            # An equivalent index exists under another name, or another text index exists
+            report.append((namespace, f"{keys}: {e}", False))
+    return report
+
+
+def _plan_stages(plan):
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _plan_stages(item)
+
+
+def audit_query_plans(client):
+    """
+    Explains each hot query shape and reports its winning plan stages.
+
+    A missing collection is planned as EOF and an empty one says little about
+    the plan real data would get, so neither counts as index-backed.
+
+    Returns:
+        list: (label, stages, status) per query, where status is OK, UNVERIFIED
+        (missing or empty collection) or FAILED (a COLLSCAN or a query the server rejected).
+    """
+    report = []
+    for label, db_name, collection_name, criteria, projection, sort in HOT_QUERIES:
+        collection = client[db_name][collection_name]
+        cursor = collection.find(criteria, projection)
+        if sort:
+            cursor = cursor.sort(sort)
+        try:
+            plan = cursor.explain()["queryPlanner"]["winningPlan"]
+            empty = collection.estimated_document_count() == 0
+        except OperationFailure as e:
+            report.append((label, [f"error: {e}"], FAILED))
+            continue
+        stages = list(_plan_stages(plan))
+        if "COLLSCAN" in stages:
+            status = FAILED
+        elif "EOF" in stages or empty:
+            status = UNVERIFIED
+            stages.append("collection missing" if "EOF" in stages else "collection empty")
+        else:
+            status = OK
+        report.append((label, stages, status))
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check-only", action="store_true", help="Only audit query plans; do not create indexes")
+    parser.add_argument("--mongo-env", default="POC_MONGOCONN", help="Environment variable holding the connection string")
+    args = parser.parse_args(argv)
+
+    client = get_mongo_client(args.mongo_env)
+
+    if not args.check_only:
+        for namespace, name, created in ensure_indexes(client):
+            print(f"{'ok  ' if created else 'warn'} {namespace}: {name}")
+
+    failures, unverified = 0, 0
+    for label, stages, status in audit_query_plans(client):
+        failures += status == FAILED
+        unverified += status == UNVERIFIED
+        print(f"{status:<4} {label}: {' <- '.join(stages)}")
+
+    if unverified:
+        print(f"{unverified} hot query shape(s) could not be verified on a missing or empty collection.", file=sys.stderr)
+    if failures:
+        print(f"{failures} hot query shape(s) are not index-backed.", file=sys.stderr)
+    return 1 if failures or unverified else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
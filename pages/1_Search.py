@@ -1,14 +1,30 @@
 import streamlit as st
-import requests
-import os, yaml, uuid
-from pymongo import MongoClient
+import os, io, yaml, uuid
 from dotenv import load_dotenv 
 import math
-from azure.storage.blob import BlobServiceClient, generate_blob_sas, BlobSasPermissions
-from datetime import datetime, timedelta
-from typing import Union
-from bson import ObjectId
+import threading
+from functools import partial
+from datetime import datetime
 from utils import add_logo
+from connections import SEARCH_DB, AGENT_LOG_DB, check_health, connection_counter, get_mongo_client, get_blob_service_client
+from agent_client import get_agent_client
+from log_waiter import LogWaiter
+from search_jobs import SearchJob, SearchJobRunner, QUEUED, RUNNING, DONE, FAILED, TIMED_OUT, CANCELLED
+from search_coordinator import SearchCoordinator, SearchQueueFull
+from batch_search import BATCH_TOP_RESULTS, SearchBatch, read_queries, rows_to_csv
+from image_upload import signed_blob_url, upload_search_image
+from records import fetch_supplier_records, fetch_product_records
+from fast_path import lookup_suppliers, lookup_products
+from result_stream import ResultWatcher, iter_new_results
+from search_history import fetch_result_page, fetch_result_content
+from result_grid import RAW_PREVIEW_CHARS, supplier_grid_html, product_grid_html, product_image_url
+from thumbnails import THUMBNAIL_WAIT, ThumbnailCache, ThumbnailService, data_uri
+from export import FORMATS as EXPORT_FORMATS, export_search
+from query_cache import normalize_query
+from search_flow import find_answered_search, run_agent_search, supplier_search_payload, product_search_payload
+from search_metrics import SearchTrace, registry, span, start_metrics_server
+from card_cache import supplier_card_cache, product_card_cache, start_invalidation
+from card_summaries import SUPPLIER_SUMMARY_COLLECTION, PRODUCT_SUMMARY_COLLECTION, start_sync as start_card_summaries_sync
 
 load_dotenv()  
 
@@ -17,8 +33,9 @@ load_dotenv()
 # supplier_db = client['uat-suppliers']
 # supplier_collection = supplier_db['gold']
 
-client = MongoClient(os.getenv("POC_MONGOCONN"))
-search_db = client['search-agent']
+# Pooled clients are created once per process and reused across reruns and sessions
+client = get_mongo_client("POC_MONGOCONN")
+search_db = client[SEARCH_DB]
 
 supplier_search_collection = search_db['supplier_search_history']
 product_search_collection = search_db['product_search_history']
@@ -26,64 +43,50 @@ product_search_collection = search_db['product_search_history']
 supplier_collection = search_db['sub_gold']
 product_collection = search_db['sub_gold_product']
 
-# Azure Blob Service Client
-blob_container = 'uploads'
-blob_service_client = BlobServiceClient.from_connection_string(os.getenv('POC_BLOB_CONN'))
+# Cards are read from the compact summary collections, falling back to the gold records
+use_card_summaries = os.getenv("CARD_SUMMARIES", "false").lower() == "true"
+if use_card_summaries:
+    supplier_card_collection = search_db[SUPPLIER_SUMMARY_COLLECTION]
+    product_card_collection = search_db[PRODUCT_SUMMARY_COLLECTION]
+    card_fallback = {'supplier': supplier_collection, 'product': product_collection}
+else:
+    supplier_card_collection = supplier_collection
+    product_card_collection = product_collection
+    card_fallback = {'supplier': None, 'product': None}
 
-SYSTEM_PROMPT = """You are LFX Supplier and Product Search Assistant, a highly efficient, professional assistant specializing in performing comprehensive searches.
-Your primary role is to provide users with helpful, polite, and accurate assistance tailored to their search needs.
-- Utilize the 'supplier_search' tool to address user queries related to factories or suppliers, offering detailed information and relevant insights.
-- Utilize the 'product_search' tool to address user queries related to products, providing comprehensive details and relevant data.
-Maintain a professional demeanor, ensure clarity in your responses, and strive to meet user expectations effectively.
-"""
+@st.cache_resource
+def start_card_summary_sync():
+    # One sync per process; deployments running `card_summaries.py sync` separately leave this off
+    return start_card_summaries_sync(client)
 
+if use_card_summaries and os.getenv("CARD_SUMMARY_SYNC", "false").lower() == "true":
+    start_card_summary_sync()
 
-def upload_blob_and_get_url(container_name: str, 
-                            blob_name: str, 
-                            data: Union[bytes, str], 
-                            blob_service_client: BlobServiceClient) -> str:
-    """
-    Uploads a blob to Azure Blob Storage and returns a public URL.
+# Card records are cached per process; optionally invalidated by change streams
+@st.cache_resource
+def start_card_cache_invalidation():
+    return [start_invalidation(supplier_card_cache, supplier_card_collection),
+            start_invalidation(product_card_cache, product_card_collection)]
 
-    Args:
-        container_name (str): The name of the container to upload to.
-        blob_name (str): The name to give the blob in storage.
-        data (Union[bytes, str]): The content to upload.
-        blob_service_client (BlobServiceClient): The BlobServiceClient instance.
+if os.getenv("CARD_CACHE_INVALIDATION", "false").lower() == "true":
+    start_card_cache_invalidation()
 
-    Returns:
-        str: The public URL of the uploaded blob.
-    """
-    try:
-        # Get the container client
-        container_client = blob_service_client.get_container_client(container_name)
-
-        # Create the container if it doesn't exist
-        if not container_client.exists():
-            container_client.create_container()
-
-        # Upload the blob
-        blob_client = container_client.get_blob_client(blob_name)
-        blob_client.upload_blob(data, overwrite=True)
-
-        # Generate a SAS token that's valid for 24 hours
-        sas_token = generate_blob_sas(
-            account_name=blob_service_client.account_name,
-            container_name=container_name,
-            blob_name=blob_name,
-            account_key=blob_service_client.credential.account_key,
-            permission=BlobSasPermissions(read=True),
-            expiry=datetime.now() + timedelta(days=365)
-        )
+# Azure Blob Service Client
+blob_container = 'uploads'
+blob_service_client = get_blob_service_client('POC_BLOB_CONN')
+
+# Seconds between status checks of a running background search
+SEARCH_POLL_INTERVAL = float(os.getenv("SEARCH_POLL_INTERVAL", 1))
 
-        # Construct the full URL
-        blob_url = f"{blob_client.url}?{sas_token}"
+# Result pagination
+RESULTS_PAGE_SIZE = int(os.getenv("RESULTS_PAGE_SIZE", 10))
+PAGE_SIZE_OPTIONS = sorted({10, 20, 30, 50, RESULTS_PAGE_SIZE})
 
-        return blob_url
+# Inline product-image thumbnails on the result cards
+PRODUCT_THUMBNAILS = os.getenv("PRODUCT_THUMBNAILS", "true").lower() == "true"
 
-    except Exception as e:
-        # Handle exceptions and provide a meaningful error message
-        raise RuntimeError(f"An error occurred while uploading the blob: {str(e)}")
+# Recent searches each session keeps in memory per tab
+SEARCH_SESSION_HISTORY = int(os.getenv("SEARCH_SESSION_HISTORY", 10))
 
 
 # Add this at the beginning of the file, after the imports
@@ -117,77 +120,331 @@ def check_password():
     
 
 def get_supplier_ids(search_id, query, thread_id):
-    
-    prompt = f"""
-I would like to perform a supplier search with the following details:
-
-- query: {query}
-
-Please execute the supplier_search function using these parameters.
-"""
-
-    additional_config = {'search_id': search_id}
-    
-    url = "https://api.uat.t4s.lfxdigital.app/agents/v1/agent/agent-call"
-    payload = {'message': prompt, 
-               'user_id': 'iamadmin', 
-               'thread_id': thread_id,
-               'additional_config': additional_config,
-               'ai_role': SYSTEM_PROMPT,}
-    
-    response = requests.post(url, json=payload)
+    return get_agent_client().call(supplier_search_payload(search_id, thread_id, query))
     
     
 def get_product_ids(search_id, thread_id, query=None, uploaded_file=None):
     
     if uploaded_file:
-        file_bytes = uploaded_file.read()
-        file_name = f"product_search_{str(uuid.uuid4())}.{uploaded_file.type.split('/')[-1]}"
-        blob_path = f"{file_name}"
-        
-        # Upload file to blob storage and get URL
-        image_path = upload_blob_and_get_url(container_name=blob_container,
-                                        blob_name=blob_path,
-                                        data=file_bytes,
-                                        blob_service_client=blob_service_client)
+        # Downscaled and stored under its content hash, so repeat searches skip the upload
+        image_path = upload_search_image(uploaded_file.getvalue(),
+                                         container_name=blob_container,
+                                         blob_service_client=blob_service_client)
     else:
         image_path = None
-        
-    prompt = f"""
-I would like to perform a product search with the following details:
+    
+    return get_agent_client().call(product_search_payload(search_id, thread_id, query, image_path))
 
-- query: {query}
-- image path: {image_path}
 
-Please execute the product_search function using these parameters.
-"""
+@st.cache_resource
+def get_log_waiter():
+    # One waiter (and one change stream) per process, shared by all sessions
+    log_collection = client[AGENT_LOG_DB]['agent_log']
+    return LogWaiter(log_collection, 
+                     mode=os.getenv("LOG_WAIT_MODE", "auto"),
+                     max_poll_interval=float(os.getenv("LOG_WAIT_MAX_POLL_INTERVAL", 2)))
 
-    additional_config = {'search_id': search_id}
 
-    url = "https://api.uat.t4s.lfxdigital.app/agents/v1/agent/agent-call"
-    payload = {'message': prompt, 
-               'user_id': 'iamadmin', 
-               'thread_id': thread_id,
-               'additional_config': additional_config,
-               "ai_role": SYSTEM_PROMPT,}
-    
-    response = requests.post(url, json=payload)
+@st.cache_resource
+def get_thumbnail_service():
+    # One disk cache and download pool per process, shared by all sessions; images
+    # are downloaded with a read SAS signed by the pooled blob client
+    return ThumbnailService(ThumbnailCache(), sign_url=lambda image_url: signed_blob_url(image_url, blob_service_client))
+
+
+@st.cache_resource
+def get_search_runner():
+    # Agent searches run in the background on one bounded pool shared by all sessions
+    return SearchJobRunner()
+
+
+@st.cache_resource
+def get_search_coordinator():
+    # Identical agent searches in flight across sessions share one job
+    return SearchCoordinator(get_search_runner())
+
+
+@st.cache_resource
+def get_result_watchers():
+    # One change stream per history collection, shared by every search being streamed
+    return {collection.name: ResultWatcher(collection) for collection in [supplier_search_collection, product_search_collection]}
+
+
+def follow_results(job, search_collection, result_watcher):
+    """Keeps the entries the agent has written so far on the job, for every session showing it."""
+    for entries in iter_new_results(search_collection, job.search_id, until=lambda: job.finished, timeout=120, 
+                                    watcher=result_watcher):
+        job.received.extend({**entry, 'content': (entry.get('content') or '')[:RAW_PREVIEW_CHARS + 1]} for entry in entries)
 
 
-def wait_for_log(thread_id, timeout=60, poll_interval=2):
+def run_search_job(job, agent_call, args, log_waiter, search_collection, normalized_query, timeout, result_watcher=None):
+    """
+    Runs on a worker thread: calls the agent, waits for its log entry and records the search.
 
-    client = MongoClient(os.getenv("POC_MONGOCONN"))  
-    db = client['ai-agent']  
-    log_collection = db['agent_log']
+    With a `result_watcher`, result entries are also kept on the job as they arrive, for a page showing them.
+    """
+    if result_watcher is not None:
+        # Woken through the shared change stream on the history collection; reads only the entries not seen yet
+        threading.Thread(target=follow_results, args=(job, search_collection, result_watcher), 
+                         name=f"search-results-{job.search_id}", daemon=True).start()
+    return run_agent_search(job, agent_call, args, log_waiter, search_collection, normalized_query, timeout)
 
-    import time
-    start_time = time.time()
-    while time.time() - start_time < timeout:
-        log = log_collection.find_one({'thread_id': thread_id})
-        if log:
-            return log
-        time.sleep(poll_interval)
-    return None
+
+def start_search_job(state_key, query, agent_call, args, search_collection, normalized_query, trace, timeout=30):
+    """
+    Queues an agent search for this session's `state_key` tab and returns at once.
+
+    Joins an identical search already in flight instead, if there is one; image
+    searches (no `normalized_query`) are never shared. When the queue is full the
+    search is turned away with a notice.
+    """
+    kind = state_key.split('_')[0]
+    job = SearchJob(kind, trace.search_id, trace.thread_id, query=query, trace=trace)
+    log_waiter = get_log_waiter()
+    key = (kind, normalized_query) if normalized_query else None
+    result_watcher = get_result_watchers()[search_collection.name] if st.session_state.get('stream_results', True) else None
+    try:
+        st.session_state[f'{state_key}_job'] = get_search_coordinator().submit(
+            key, job, lambda job: run_search_job(job, agent_call, args, log_waiter, search_collection, normalized_query, timeout, result_watcher))
+    except SearchQueueFull as e:
+        st.session_state['last_search_metrics'] = trace.finish('rejected')
+        st.session_state[f'{state_key}_notice'] = ('error', f"The search service is busy: {e}")
+
+
+def cancel_search_job(state_key, notify=True):
+    # The worker notices the cancel event and stops waiting; its result is dropped
+    job = st.session_state.pop(f'{state_key}_job', None)
+    st.session_state.pop(f'{state_key}_stream_cards', None)
+    if job is None:
+        return
+    job.cancel()
+    st.session_state['last_search_metrics'] = job.trace.finish('cancelled')
+    if notify:
+        st.session_state[f'{state_key}_notice'] = ('warning', "Search cancelled.")
+
+
+def finish_search_job(state_key, job):
+    del st.session_state[f'{state_key}_job']
+    # Cards already shown while streaming are not fetched again for the final grid
+    stream_cards = st.session_state.pop(f'{state_key}_stream_cards', {})
+    if job.shared:
+        # Time this session waited on another session's agent call
+        job.trace.record('shared_wait', job.elapsed())
+    if job.status == DONE:
+        search = new_search_state(job.search_id, job.query, job.result['scores'], job.result['ai_answer'])
+        search['cards'].update(stream_cards)
+        keep_search(state_key, search)
+        st.session_state[state_key]['trace'] = job.trace
+        return
+
+    if job.status == FAILED:
+        # Agent failures surface at once instead of waiting for the log timeout
+        status, notice = 'error', f"Search failed: {job.error}"
+    elif job.status == TIMED_OUT:
+        status, notice = 'timeout', "Failed to retrieve the log entry within the timeout period."
+    else:
+        status, notice = 'cancelled', "Search cancelled."
+    st.session_state['last_search_metrics'] = job.trace.finish(status)
+    st.session_state[f'{state_key}_notice'] = ('error' if status != 'cancelled' else 'warning', notice)
+
+
+def display_search_notice(state_key):
+    notice = st.session_state.pop(f'{state_key}_notice', None)
+    if notice is not None:
+        level, message = notice
+        getattr(st, level)(message)
+
+
+@st.fragment(run_every=SEARCH_POLL_INTERVAL)
+def display_search_job(state_key, id_key, display_grid):
+    """Polls this session's running search without holding the script thread; reruns the page when it ends."""
+    job = st.session_state.get(f'{state_key}_job')
+    if job is None:
+        return
+    if job.finished:
+        finish_search_job(state_key, job)
+        st.rerun()
+
+    cols = st.columns([4, 1])
+    position = job.queue_position() if job.status == QUEUED else None
+    if position is not None:
+        stats = get_search_runner().stats()
+        cols[0].info(f"⏳ Waiting for a free search slot: number {position} of {stats['queued']} in the queue, "
+                     f"{job.elapsed():.0f}s so far ({stats['running']} of {stats['max_workers']} slots in use)...")
+    else:
+        cols[0].info(f"⏳ Searching for '{job.query or 'the uploaded image'}'... {job.elapsed():.0f}s")
+    if job.shared:
+        cols[0].caption("Another user is running the same search; its results will be shared.")
+    cols[1].button("Cancel", 
+                   key=f"{state_key}_cancel", 
+                   on_click=cancel_search_job, 
+                   args=(state_key,), 
+                   use_container_width=True)
+
+    # Cards found so far, kept on the job by follow_results, so a tick only fetches new cards;
+    # the AI summary fills in when the job finishes
+    received = job.received
+    if st.session_state.get('stream_results', True) and job.status == RUNNING and received:
+        st.caption(f"{len(received)} result(s) received so far, still searching...")
+        display_grid(*split_results(received[:RESULTS_PAGE_SIZE], id_key), 
+                     cards=st.session_state.setdefault(f'{state_key}_stream_cards', {}))
+
+
+# Trace status for each way a background job can end
+TRACE_STATUSES = {DONE: 'ok', FAILED: 'error', TIMED_OUT: 'timeout', CANCELLED: 'cancelled'}
+
+
+def card_name(kind, record):
+    if kind == 'supplier':
+        return record['SupplierBasic']['Demographics']['EntityFullName']
+    return record['item_description'].replace("  ", " ")
+
+
+def run_batch_query(job, image, log_waiter, force_refresh=False, top_n=BATCH_TOP_RESULTS):
+    """Runs on a worker thread: answers one batch query from the fast path, the query cache or the agent."""
+    if job.kind == 'supplier':
+        search_collection, id_key = supplier_search_collection, 'supplier_ids'
+        lookup = lambda: lookup_suppliers(supplier_collection, job.query, cache=supplier_card_cache)
+        agent_call, args = get_supplier_ids, (job.search_id, job.query, job.thread_id)
+        fetch_records, card_collection, cache = fetch_supplier_records, supplier_card_collection, supplier_card_cache
+    else:
+        search_collection, id_key = product_search_collection, 'uuid'
+        lookup = lambda: lookup_products(product_collection, job.query, cache=product_card_cache)
+        agent_call, args = get_product_ids, (job.search_id, job.thread_id, job.query, io.BytesIO(image) if image else None)
+        fetch_records, card_collection, cache = fetch_product_records, product_card_collection, product_card_cache
+
+    # Image searches are never served from the fast path or the query cache
+    normalized_query = normalize_query(job.query) if image is None else ""
+    fast_path_results, search_record = find_answered_search(job.trace, lookup if image is None else None, 
+                                                            search_collection, normalized_query, force_refresh)
+
+    if fast_path_results is not None:
+        job.trace.update(source='fast_path')
+        scores = [result['score'] for result in fast_path_results]
+        top = fast_path_results[:top_n]
+    else:
+        search_id = job.search_id
+        if search_record is not None:
+            search_id = search_record['search_id']
+            job.trace.update(source='cache', search_id=search_id)
+            scores = [result.get('score', 0) for result in search_record['result']]
+        else:
+            job.trace.update(source='agent', thread_id=job.thread_id)
+            outcome = run_search_job(job, agent_call, args, log_waiter, search_collection, normalized_query, timeout=30)
+            if outcome is None:
+                return None
+            scores = outcome['scores']
+        with span(job.trace, 'page_fetch'):
+            top = fetch_result_page(search_collection, search_id, 0, top_n, content_chars=0)
+
+    ids = [result[id_key] for result in top]
+    with span(job.trace, 'card_fetch'):
+        records, _ = fetch_records(card_collection, ids, cache=cache, fallback=card_fallback[job.kind])
+    percentages = format_scores(scores) if scores else []
+    return {'source': job.trace.source, 
+            'total': len(scores), 
+            'top': [{'id': result_id, 
+                     'name': card_name(job.kind, record) if record is not None else None, 
+                     'score': round(percentage, 1), 
+                     'reason': result['reason']} 
+                    for result_id, record, percentage, result in zip(ids, records, percentages, top)]}
+
+
+def start_batch(kind, rows, force_refresh):
+    """Starts a batch for this session; its queries share the search runner with single searches."""
+    batch = SearchBatch(kind, rows)
+    for job in batch.jobs:
+        job.trace = SearchTrace(kind, event='batch', search_id=job.search_id)
+    log_waiter = get_log_waiter()
+    st.session_state['batch_search'] = batch.start(
+        get_search_runner(), 
+        lambda job, image: run_batch_query(job, image, log_waiter, force_refresh), 
+        on_done=lambda job: job.trace.finish(TRACE_STATUSES.get(job.status, 'ok')))
+
+
+def cancel_batch(notify=True):
+    batch = st.session_state.get('batch_search')
+    if batch is None or batch.finished:
+        return
+    batch.cancel()
+    if notify:
+        st.session_state['batch_search_notice'] = ('warning', "Batch cancelled; finished queries are kept.")
+
+
+def display_batch_tables(batch):
+    st.dataframe(batch.status_rows(), hide_index=True, use_container_width=True)
+    result_rows = batch.result_rows()
+    if result_rows:
+        st.markdown("##### Results")
+        st.dataframe(result_rows, hide_index=True, use_container_width=True)
+    return result_rows
+
+
+@st.fragment(run_every=SEARCH_POLL_INTERVAL)
+def display_batch_progress():
+    """Polls this session's running batch; reruns the page when it ends."""
+    batch = st.session_state.get('batch_search')
+    if batch is None:
+        return
+    if batch.finished:
+        st.rerun()
+
+    progress = batch.progress()
+    done = len(batch.jobs) - progress.get(QUEUED, 0) - progress.get(RUNNING, 0)
+    cols = st.columns([4, 1])
+    cols[0].progress(done / len(batch.jobs), 
+                     text=f"⏳ {done} of {len(batch.jobs)} queries finished, {progress.get(RUNNING, 0)} running... {batch.elapsed():.0f}s")
+    cols[1].button("Cancel", 
+                   key="batch_search_cancel", 
+                   on_click=cancel_batch, 
+                   use_container_width=True)
+    display_batch_tables(batch)
+
+
+def display_batch_results(batch):
+    progress = batch.progress()
+    summary = ", ".join(f"{count} {status}" for status, count in sorted(progress.items()))
+    st.success(f"Batch of {len(batch.jobs)} {batch.kind} queries finished in {batch.elapsed():.1f}s ({summary}).")
+    result_rows = display_batch_tables(batch)
+    if result_rows:
+        st.download_button("Download results (CSV)", 
+                           rows_to_csv(result_rows), 
+                           file_name=f"{batch.kind}_batch_results.csv", 
+                           mime="text/csv", 
+                           key="batch_search_download")
+
+
+@st.cache_resource
+def init_metrics():
+    # Pool, cache and waiter state alongside the per-search timings
+    registry.register_gauge("search_mongo_connections", "MongoDB connections of the shared pool.",
+                            lambda: {(('state', state),): value for state, value in
+                                     [('live', connection_counter.live), ('peak', connection_counter.peak), ('checked_out', connection_counter.checked_out)]})
+    # Pings each pooled client on every scrape
+    registry.register_gauge("search_mongo_up", "1 when the pooled MongoClient for a connection env var answers a ping.",
+                            lambda: {(('client', env_var),): int(up) for env_var, up in check_health()['mongo'].items()})
+    registry.register_gauge("search_card_cache", "Card cache statistics.",
+                            lambda: {(('cache', name), ('stat', stat)): value
+                                     for name, cache in [('supplier', supplier_card_cache), ('product', product_card_cache)]
+                                     for stat, value in cache.stats().items()})
+    registry.register_gauge("search_log_waiters", "Sessions currently waiting for an agent_log entry.",
+                            lambda: {(): get_log_waiter().stats()['waiting']})
+    # Recent agent_log time-to-result by delivery mode, to compare the change stream with polling
+    registry.register_gauge("search_log_wait_seconds", "Recent time from wait start to agent_log entry, by delivery mode.",
+                            lambda: {(('mode', mode), ('stat', stat)): value
+                                     for mode, timings in get_log_waiter().stats().items() if isinstance(timings, dict)
+                                     for stat, value in timings.items()})
+    registry.register_gauge("search_log_wait_mode", "1 for the delivery mode the log waiter is using.",
+                            lambda: {(('mode', mode),): int(get_log_waiter().stats()['active_mode'] == mode) for mode in ['stream', 'poll']})
+    registry.register_gauge("search_jobs", "Background agent searches by state.",
+                            lambda: {(('state', state),): get_search_runner().stats()[state] for state in ['queued', 'running']})
+    registry.register_gauge("search_coalescing", "Agent searches shared between sessions, and searches turned away by a full queue.",
+                            lambda: {(('stat', stat),): value for stat, value in get_search_coordinator().stats().items()})
+    registry.register_gauge("search_thumbnails", "Product thumbnail cache and downloads.",
+                            lambda: {(('stat', stat),): value for stat, value in get_thumbnail_service().stats().items()})
+    return start_metrics_server()
+
+init_metrics()
 
 
 def remove_none_and_specific_keys(d, keys_to_remove):
@@ -204,162 +461,70 @@ def remove_none_and_specific_keys(d, keys_to_remove):
 keys_to_remove = ['_id', 'FacilityImage']
 
 
-def display_supplier_record(record):
-    supplier_basic = record['SupplierBasic']['Demographics']
-    
-    supplier_id = record['System']['ID']
-    entity_full_name = supplier_basic['EntityFullName']
-    registration_country = supplier_basic['RegistrationCountry']
-    year_established = supplier_basic.get('YearEstablished', 'Unknown')
-    headquarter_address = supplier_basic.get('HeadquarterAddress', 'Not specified')
-
-    return f"""
-    <div style="border:1px solid #d1d1d1; padding: 10px 20px; border-radius: 10px; height: 150px; background-color: #f9f9f9; box-shadow: 0 2px 5px rgba(0,0,0,0.1);">
-        <h3 style="margin: 0 0 5px 0; max-height: 35px; overflow-y: auto; color: #2c3e50; font-size: 20px;">{entity_full_name}</h3>
-        <div style="display: flex; justify-content: space-between; margin: 5px 0; color: #2c3e50; font-size: 14px;">
-            <p style="margin: 0;"><strong>🆔 ID:</strong> {supplier_id}</p>
-            <p style="margin: 0;"><strong>🌍 Country:</strong> {registration_country}</p>
-            <p style="margin: 0;"><strong>📅 Established:</strong> {year_established}</p>
-        </div>
-        <div style="display: flex; justify-content: space-between; align-items: center; margin-top: 10px; color: #2c3e50; font-size: 14px;">
-            <p style="margin: 0; max-height: 30px; overflow-y: auto;"><strong>🏢 HQ:</strong> {headquarter_address}</p>
-            <a href="https://stasduseanplfs2uatui.z23.web.core.windows.net/supplier/{supplier_id}" target="_blank">
-                <button style="padding: 10px 20px; background-color: #2980b9; color: white; border: none; border-radius: 5px; cursor: pointer; font-size: 14px;">
-                    Details
-                </button>
-            </a>
-        </div>
-    </div>
+def load_cards(fetch_records, collection, ids, cache, fallback, cards=None, trace=None):
     """
+    Returns the card records for `ids` in ranking order, plus the IDs with no record.
 
-
-def display_supplier_grid(supplier_ids, reasons, contents, scores):
+    Cards already held in `cards` (a search's session state) are not fetched
+    again; the rest are read in one round trip and added to it.
+    """
+    if cards is None:
+        cards = {}
+    to_fetch = [key for key in dict.fromkeys(ids) if key not in cards]
+    if to_fetch:
+        with span(trace, 'card_fetch'):
+            records, _ = fetch_records(collection, to_fetch, cache=cache, fallback=fallback)
+        cards.update(zip(to_fetch, records))
+    records = [cards[key] for key in ids]
+    return records, [key for key, record in zip(ids, records) if record is None]
+
+
+def display_supplier_grid(supplier_ids, reasons, contents, scores, trace=None, cards=None):
     st.markdown("### 🏬 Supplier Search Results")
     
-    num_to_display = 2
-    # Calculate the number of rows needed
-    num_suppliers = len(supplier_ids)
-    num_rows = math.ceil(num_suppliers / num_to_display)
-    try:
-        for row in range(num_rows):
-            cols = st.columns(num_to_display)
-            for col in range(num_to_display):
-                index = row * num_to_display + col
-                if index < num_suppliers:
-                    
-                    supplier_id = supplier_ids[index]
-                    id_criteria = {"System.ID": supplier_id}
-                    supplier_record = supplier_collection.find_one(id_criteria)
-
-                    cols[col].markdown(display_supplier_record(supplier_record), unsafe_allow_html=True)
-                    
-                    content = contents[index]
-                    reason = reasons[index]
-                    score = scores[index]
-                    
-                    reason_html = f"""
-                    <div style="border: 1px solid #d1d1d1; border-radius: 5px; padding: 10px; background-color: #d4f5d4; color: #2c3e50; font-size: 14px; margin-top: 10px; min-height: 85px;">
-                        <strong>Score:</strong> {score:.2f}<br>
-                        <strong>Reason:</strong> {reason}
-                    </div>
-                    """
-                    cols[col].markdown(reason_html, unsafe_allow_html=True)
-                    
-                    # Add expander for more details
-                    with cols[col].expander("RAW OUTPUT", expanded=False):
-                        st.markdown(content)
-                else:
-                    cols[col].markdown("")
-    except:
-        pass
+    supplier_records, missing_ids = load_cards(fetch_supplier_records, supplier_card_collection, supplier_ids, 
+                                               supplier_card_cache, card_fallback['supplier'], cards, trace)
+    if missing_ids:
+        st.warning(f"{len(missing_ids)} supplier(s) returned by the search could not be found: {', '.join(map(str, missing_ids))}")
     
+    results = [(record, reason, content, score) 
+               for record, reason, content, score in zip(supplier_records, reasons, contents, scores) 
+               if record is not None]
     
-def display_product_record(record):
-    product_id = record['product_id']
+    # The whole grid goes to the browser as a single element
+    with span(trace, 'render'):
+        html = supplier_grid_html(*zip(*results)) if results else ""
+        st.markdown(html, unsafe_allow_html=True)
+    if trace is not None:
+        trace.update(render_bytes=len(html.encode('utf-8')))
     
-    product_full_name = record['item_description']
-    product_full_name = product_full_name.replace("  ", " ")
     
-    product_family = record.get('product_family', 'Not specified')
-    product_category = record.get('product_category', 'Not specified')
+def display_product_grid(product_uuids, reasons, contents, scores, trace=None, cards=None, thumbnail_wait=THUMBNAIL_WAIT):
+    st.markdown("### 🛍️ Product Search Results")
     
-    html_content = f"""
-    <div style="border:1px solid #d1d1d1; padding: 10px 20px; border-radius: 10px; height: 150px; background-color: #f9f9f9; box-shadow: 0 2px 5px rgba(0,0,0,0.1);">
-        <h3 style="margin: 0 0 5px 0; max-height: 35px; overflow-y: auto; color: #2c3e50; font-size: 20px;">{product_full_name}</h3>
-        <div style="display: flex; justify-content: space-between; margin: 5px 0; color: #2c3e50; font-size: 14px;">
-            <p style="margin: 0;"><strong>🆔 ID:</strong> {product_id}</p>
-            <p style="margin: 0;"><strong>📦 Family:</strong> {product_family}</p>
-        </div>
-        <div style="display: flex; justify-content: space-between; align-items: center; margin-top: 10px; color: #2c3e50; font-size: 14px;">
-            <p style="margin: 0; max-height: 30px; overflow-y: auto;"><strong>🏷️ Category:</strong> {product_category}</p>
-        </div>
-    </div>
-    """
-
-    if record['has_image'] == "yes":
-        image_url = record.get('image_url')
-        image_url = f"{image_url}?sv=2023-01-03&st=2024-03-07T09%3A40%3A39Z&se=2025-01-31T15%3A59%3A00Z&sr=s&sp=rl&sig=OdgpbBwJ2b9oCTTuvp%2BzVKmJ9xeLjt8DFp7F%2BdARauQ%3D"
-        
-        html_content = f"""
-    <div style="border:1px solid #d1d1d1; padding: 10px 20px; border-radius: 10px; height: 150px; background-color: #f9f9f9; box-shadow: 0 2px 5px rgba(0,0,0,0.1);">
-        <h3 style="margin: 0 0 5px 0; max-height: 35px; overflow-y: auto; color: #2c3e50; font-size: 20px;">{product_full_name}</h3>
-        <div style="display: flex; justify-content: space-between; margin: 5px 0; color: #2c3e50; font-size: 14px;">
-            <p style="margin: 0;"><strong>🆔 ID:</strong> {product_id} </p>
-            <p style="margin: 0;"><strong>📦 Family:</strong> {product_family}</p>
-        </div>
-        <div style="display: flex; justify-content: space-between; align-items: center; margin-top: 10px; color: #2c3e50; font-size: 14px;">
-            <p style="margin: 0; max-height: 30px; overflow-y: auto;"><strong>🏷️ Category:</strong> {product_category}</p>
-            <a href="{image_url}" target="_blank">
-                <button style="padding: 10px 20px; background-color: #2980b9; color: white; border: none; border-radius: 5px; cursor: pointer; font-size: 14px;">
-                    Image
-                </button>
-            </a>
-        </div>
-    </div>
-    """
-
-    return html_content
+    product_records, missing_ids = load_cards(fetch_product_records, product_card_collection, product_uuids, 
+                                              product_card_cache, card_fallback['product'], cards, trace)
+    if missing_ids:
+        st.warning(f"{len(missing_ids)} product(s) returned by the search could not be found: {', '.join(missing_ids)}")
     
-
-def display_product_grid(product_uuids, reasons, contents, scores):
-    st.markdown("### 🛍️ Product Search Results")
+    results = [(record, reason, content, score) 
+               for record, reason, content, score in zip(product_records, reasons, contents, scores) 
+               if record is not None]
     
-    num_to_display = 2
-    # Calculate the number of rows needed
-    num_products = len(product_uuids)
-    num_rows = math.ceil(num_products / num_to_display)
-    try:
-        for row in range(num_rows):
-            cols = st.columns(num_to_display)
-            for col in range(num_to_display):
-                index = row * num_to_display + col
-                
-                if index < num_products:
-                    product_uuid = product_uuids[index]
-                    id_criteria = {"_id": ObjectId(product_uuid)}
-                    product_record = product_collection.find_one(id_criteria)
-
-                    cols[col].markdown(display_product_record(product_record), unsafe_allow_html=True)
-                    
-                    content = contents[index]
-                    reason = reasons[index]
-                    score = scores[index]
-                    
-                    reason_html = f"""
-                    <div style="border: 1px solid #d1d1d1; border-radius: 5px; padding: 10px; background-color: #d4f5d4; color: #2c3e50; font-size: 14px; margin-top: 10px; min-height: 85px;">
-                        <strong>Score:</strong> {score:.2f}<br>
-                        <strong>Reason:</strong> {reason}
-                    </div>
-                    """
-                    cols[col].markdown(reason_html, unsafe_allow_html=True)
-                    
-                    # Add expander for more details
-                    with cols[col].expander("RAW OUTPUT", expanded=False):
-                        st.markdown(content)
-                else:
-                    cols[col].markdown("")
-    except:
-        pass
+    thumbnails = None
+    image_urls = [product_image_url(result[0]) for result in results]
+    if PRODUCT_THUMBNAILS and any(image_urls):
+        with span(trace, 'thumbnails'):
+            thumbnails = {image_url: data_uri(thumbnail) 
+                          for image_url, thumbnail in get_thumbnail_service().get_many(filter(None, image_urls), thumbnail_wait).items()}
+    
+    # The whole grid goes to the browser as a single element
+    with span(trace, 'render'):
+        html = product_grid_html(*zip(*results), thumbnails=thumbnails, 
+                                 sign_url=lambda image_url: signed_blob_url(image_url, blob_service_client)) if results else ""
+        st.markdown(html, unsafe_allow_html=True)
+    if trace is not None:
+        trace.update(render_bytes=len(html.encode('utf-8')))
     
     
 def format_scores(scores):
@@ -368,6 +533,222 @@ def format_scores(scores):
     return percentage_scores
 
 
+def split_results(result_list, id_key):
+    ids = [result[id_key] for result in result_list]
+    reasons = [result['reason'] for result in result_list]
+    contents = [result['content'] for result in result_list]
+    scores = [result['score'] for result in result_list]
+    return ids, reasons, contents, format_scores(scores)
+
+
+def display_search_metrics(record):
+    st.sidebar.markdown(f"**{record['kind'].title()} {record['event'].replace('_', ' ')}** · {record['source'] or 'results'} · {record['status']}")
+    phases = [{'phase': name, 'ms': round(seconds * 1000, 1)} for name, seconds in record['spans'].items()]
+    phases.append({'phase': 'total', 'ms': round(record['total_seconds'] * 1000, 1)})
+    st.sidebar.dataframe(phases, hide_index=True, use_container_width=True)
+    if record.get('render_bytes'):
+        st.sidebar.caption(f"Results grid: {record['render_bytes'] / 1024:.1f} KB of HTML")
+    if record['token_usage']:
+        st.sidebar.json(record['token_usage'], expanded=False)
+
+
+def format_cache_age(cached_at):
+    minutes = int((datetime.utcnow() - cached_at).total_seconds() // 60)
+    if minutes < 1:
+        return "less than a minute ago"
+    return f"{minutes} minute{'s' if minutes > 1 else ''} ago"
+
+
+def new_search_state(search_id, query, scores, ai_answer, cached_at=None, results=None):
+    # Scores are normalized once over the full list so percentages agree across pages.
+    # Result pages and cards are filled in as they are viewed, so reruns re-render from memory.
+    return {'search_id': search_id,
+            'query': query,
+            'searched_at': datetime.now(),
+            'ai_answer': ai_answer,
+            'cached_at': cached_at,
+            'results': results,
+            'scores': format_scores(scores) if scores else [],
+            'page': 0,
+            'loaded_results': {},
+            'cards': {}}
+
+
+def new_fast_path_state(query, results):
+    # Direct lookups have no search-history document; the few results live in the state
+    return new_search_state(str(uuid.uuid4()), 
+                            query, 
+                            [result['score'] for result in results], 
+                            f"Direct match for '{query.strip()}', answered without calling the AI agent.", 
+                            results=results)
+
+
+def keep_search(state_key, search):
+    """Makes `search` the tab's current search and the newest entry of its session history."""
+    history = st.session_state.setdefault(f'{state_key}_history', {})
+    history.pop(search['search_id'], None)
+    history[search['search_id']] = search
+    while len(history) > SEARCH_SESSION_HISTORY:
+        del history[next(iter(history))]
+    st.session_state[state_key] = search
+
+
+def switch_search(state_key):
+    search_id = st.session_state[f'{state_key}_history_choice']
+    history = st.session_state.get(f'{state_key}_history', {})
+    if search_id in history:
+        st.session_state[state_key] = history[search_id]
+
+
+def format_history_entry(search):
+    label = search['query'] or "Image search"
+    return f"{search['searched_at']:%H:%M} · {label} · {len(search['scores'])} result(s)"
+
+
+def display_search_history(state_key):
+    # Switching between recent searches re-renders from session state, without a database call
+    history = st.session_state.get(f'{state_key}_history', {})
+    if len(history) < 2:
+        return
+    search_ids = list(reversed(history))
+    current = st.session_state.get(state_key)
+    st.session_state[f'{state_key}_history_choice'] = current['search_id'] if current is not None and current['search_id'] in history else None
+    st.selectbox("Recent searches", 
+                 search_ids, 
+                 format_func=lambda search_id: format_history_entry(history[search_id]), 
+                 index=None, 
+                 placeholder="🕘 Recent searches...", 
+                 key=f'{state_key}_history_choice', 
+                 on_change=switch_search, 
+                 args=(state_key,))
+
+
+def change_page(state_key, step):
+    st.session_state[state_key]['page'] += step
+
+
+def reset_page(state_key):
+    st.session_state[state_key]['page'] = 0
+
+
+def display_search_results(state_key, search_collection, id_key, display_grid, title):
+    search = st.session_state[state_key]
+    # The first render finishes the search's own trace; later reruns are page views
+    trace = search.pop('trace', None) or SearchTrace(state_key.split('_')[0], event='page_view', search_id=search['search_id'])
+    try:
+        display_search_page(search, state_key, search_collection, id_key, display_grid, title, trace)
+    finally:
+        st.session_state['last_search_metrics'] = trace.finish()
+
+
+def display_search_page(search, state_key, search_collection, id_key, display_grid, title, trace):
+    if search['cached_at'] is not None:
+        st.info(f"⚡ Showing cached results from {format_cache_age(search['cached_at'])}. Tick 'Force refresh' to run a new search.")
+    if search['results'] is not None:
+        st.success(f"⚡ {search['ai_answer']}")
+    else:
+        st.success(f"🤖: {search['ai_answer']}")
+    st.divider()
+
+    total = len(search['scores'])
+    if total == 0:
+        st.markdown(title)
+        st.markdown("##### Apologies, no matching results were found. Please try adjusting your search criteria or keywords.")
+        return
+
+    page_size = st.session_state.get(f"{state_key}_page_size", RESULTS_PAGE_SIZE)
+    num_pages = math.ceil(total / page_size)
+    page = max(0, min(search['page'], num_pages - 1))
+    skip = page * page_size
+
+    # Only the visible page is read from the search history, with raw outputs cut to their preview,
+    # and only the first time it is shown
+    if search['results'] is not None:
+        page_results = search['results'][skip:skip + page_size]
+    else:
+        loaded = search['loaded_results']
+        indexes = range(skip, min(skip + page_size, total))
+        if any(index not in loaded for index in indexes):
+            with span(trace, 'page_fetch'):
+                fetched = fetch_result_page(search_collection, search['search_id'], skip, page_size, 
+                                            content_chars=RAW_PREVIEW_CHARS + 1)
+            loaded.update(zip(indexes, fetched))
+        page_results = [loaded[index] for index in indexes if index in loaded]
+    ids = [result[id_key] for result in page_results]
+    reasons = [result['reason'] for result in page_results]
+    contents = [result['content'] for result in page_results]
+    display_grid(ids, reasons, contents, search['scores'][skip:skip + len(page_results)], trace=trace, cards=search['cards'])
+
+    cols = st.columns([1, 3, 1, 1])
+    cols[0].button("◀ Previous", 
+                   key=f"{state_key}_previous", 
+                   disabled=page == 0, 
+                   on_click=change_page, 
+                   args=(state_key, -1), 
+                   use_container_width=True)
+    cols[1].markdown(f"Results {skip + 1}–{skip + len(page_results)} of {total} · Page {page + 1} of {num_pages}")
+    cols[2].button("Next ▶", 
+                   key=f"{state_key}_next", 
+                   disabled=page >= num_pages - 1, 
+                   on_click=change_page, 
+                   args=(state_key, 1), 
+                   use_container_width=True)
+    cols[3].selectbox("Page size", 
+                      PAGE_SIZE_OPTIONS, 
+                      index=PAGE_SIZE_OPTIONS.index(RESULTS_PAGE_SIZE), 
+                      key=f"{state_key}_page_size", 
+                      on_change=reset_page, 
+                      args=(state_key,), 
+                      label_visibility='collapsed')
+
+    if search['results'] is None:
+        display_raw_output(search, state_key, search_collection, id_key, page_results, skip, page, trace)
+        display_export(search, state_key)
+
+
+def display_export(search, state_key):
+    # The full result list is streamed from MongoDB only when asked for; nothing is kept in the session
+    kind = state_key.split('_')[0]
+    cols = st.columns([1, 1, 2])
+    file_format = cols[0].selectbox("Export format", 
+                                    EXPORT_FORMATS, 
+                                    format_func=str.upper, 
+                                    key=f"{state_key}_export_format", 
+                                    label_visibility='collapsed')
+    if not cols[1].button("Export all results", key=f"{state_key}_export", use_container_width=True):
+        return
+    output = io.BytesIO()
+    with st.spinner("Exporting results..."):
+        count = export_search(search_db, kind, search['search_id'], output, file_format)
+    cols[2].download_button(f"⬇️ Download {count} results ({file_format.upper()})", 
+                            output.getvalue(), 
+                            file_name=f"{kind}_search_{search['search_id']}.{file_format}", 
+                            mime="text/csv" if file_format == "csv" else "application/octet-stream", 
+                            key=f"{state_key}_export_download", 
+                            use_container_width=True)
+
+
+def display_raw_output(search, state_key, search_collection, id_key, page_results, skip, page, trace):
+    # The full raw output is fetched only for the result the user picks
+    labels = {skip + i: f"#{skip + i + 1} · {result[id_key]}" for i, result in enumerate(page_results)}
+    index = st.selectbox("Raw output", 
+                         list(labels), 
+                         format_func=labels.get, 
+                         index=None, 
+                         placeholder="🔎 Show the full raw output of a result...", 
+                         key=f"{state_key}_raw_output_{search['search_id']}_{page}", 
+                         label_visibility='collapsed')
+    if index is None:
+        return
+
+    raw_outputs = search.setdefault('raw_outputs', {})
+    if index not in raw_outputs:
+        with span(trace, 'raw_fetch'):
+            raw_outputs[index] = fetch_result_content(search_collection, search['search_id'], index)
+    with st.container(border=True):
+        st.markdown(raw_outputs[index] or "_No raw output was recorded for this result._")
+
+
 # Set page configuration and theme
 st.set_page_config(
     layout="wide",
@@ -382,8 +763,13 @@ if check_password():
 
     st.title('🏭 Supplier & Product Search 🛒')
 
+    st.sidebar.toggle("Show results as they arrive", 
+                      value=os.getenv("SEARCH_STREAMING", "true").lower() == "true", 
+                      key="stream_results",
+                      help="Render each card as soon as the agent finds it; the AI summary fills in last")
+
     # Create tabs
-    tabs = st.tabs(["Supplier Search", "Product Search"])
+    tabs = st.tabs(["Supplier Search", "Product Search", "Batch Search"])
 
     # Supplier Search tab
     with tabs[0]:
@@ -426,50 +812,55 @@ if check_password():
                                             key="search_supplier_button", 
                                             help="Click to search", 
                                             use_container_width=True)
+            force_refresh_supplier = st.checkbox("Force refresh", 
+                                                 key="force_refresh_supplier", 
+                                                 help="Ignore cached results and run a new search")
 
         # Add functionality for the supplier search button here
         if search_supplier_button:
             if query_supplier:
+                st.session_state.pop('supplier_search', None)
+                cancel_search_job('supplier_search', notify=False)
                 with st.spinner("Searching for suppliers..."):
-                    search_id = str(uuid.uuid4())
-                    thread_id = str(uuid.uuid4())
-
-                    get_supplier_ids(search_id, query_supplier, thread_id)
-
-                    log = wait_for_log(thread_id, timeout=30)
-
-                    if log is None:
-                        st.error("Failed to retrieve the log entry within the timeout period.")
+                    normalized_query = normalize_query(query_supplier)
+                    trace = SearchTrace('supplier')
+                    # Plain ID and name lookups are answered straight from sub_gold
+                    fast_path_results, search_record = find_answered_search(
+                        trace, 
+                        lambda: lookup_suppliers(supplier_collection, query_supplier, cache=supplier_card_cache), 
+                        supplier_search_collection, normalized_query, force_refresh_supplier)
+
+                    if fast_path_results is not None:
+                        trace.update(source='fast_path')
+                        keep_search('supplier_search', new_fast_path_state(query_supplier, fast_path_results))
+                    elif search_record is not None:
+                        trace.update(source='cache', search_id=search_record['search_id'])
+                        keep_search('supplier_search', new_search_state(search_record['search_id'], 
+                                                                        query_supplier, 
+                                                                        [result.get('score', 0) for result in search_record['result']], 
+                                                                        search_record.get('ai_response', ''), 
+                                                                        search_record['cached_at']))
                     else:
-                        token_usage = log['token_usage']
-                        ai_answer = log['ai_response']
-                        st.success(f"🤖: {ai_answer}")
-                        st.divider()
-
-                        critiria = {"search_id": search_id}
-                        search_record = supplier_search_collection.find_one(critiria)
-                            
-                        result_list = search_record.get('result')
-                        if result_list is not None:
-                            length = len(result_list)
-                        else:
-                            length = 0
-                            
-                        if length > 0:
-                            supplier_ids = [result['supplier_ids'] for result in result_list]
-                            reasons = [result['reason'] for result in result_list]
-                            contents = [result['content'] for result in result_list]
-                            scores = [result['score'] for result in result_list]
-                            scores = format_scores(scores)
-
-                            display_limit = 30
-                            display_supplier_grid(supplier_ids[:display_limit], 
-                                                reasons[:display_limit], 
-                                                contents[:display_limit],
-                                                scores[:display_limit])
-                        else:
-                            st.markdown("### 🏬 Supplier Search Results")
-                            st.markdown("##### Apologies, no matching results were found. Please try adjusting your search criteria or keywords.")
+                        search_id = str(uuid.uuid4())
+                        thread_id = str(uuid.uuid4())
+
+                        trace.update(source='agent', search_id=search_id, thread_id=thread_id)
+                        start_search_job('supplier_search', query_supplier, get_supplier_ids, (search_id, query_supplier, thread_id), 
+                                         supplier_search_collection, normalized_query, trace)
+
+                    if 'supplier_search' in st.session_state:
+                        st.session_state['supplier_search']['trace'] = trace
+
+        display_search_history('supplier_search')
+        display_search_notice('supplier_search')
+        if 'supplier_search_job' in st.session_state:
+            display_search_job('supplier_search', 'supplier_ids', display_supplier_grid)
+        if 'supplier_search' in st.session_state:
+            display_search_results('supplier_search', 
+                                   supplier_search_collection, 
+                                   'supplier_ids', 
+                                   display_supplier_grid, 
+                                   "### 🏬 Supplier Search Results")
 
     # Product Search tab
     with tabs[1]:
@@ -511,50 +902,115 @@ if check_password():
                                             key="search_product_button", 
                                             help="Click to search", 
                                             use_container_width=True)
+            force_refresh_product = st.checkbox("Force refresh", 
+                                                key="force_refresh_product", 
+                                                help="Ignore cached results and run a new search")
             if image_path:
                 st.image(image_path, caption="Uploaded Image", use_column_width=True)
         # Add functionality for the supplier search button here
         if search_product_button:
             if query_product or image_path:
+                st.session_state.pop('product_search', None)
+                cancel_search_job('product_search', notify=False)
                 with st.spinner("Searching for products..."):
-                    search_id = str(uuid.uuid4())
-                    thread_id = str(uuid.uuid4())
-
-                    get_product_ids(search_id, thread_id, query_product, image_path)
+                    # Image searches are never served from the query cache
+                    normalized_query = normalize_query(query_product) if not image_path else ""
+                    trace = SearchTrace('product')
+                    # Plain ID and description lookups are answered straight from sub_gold_product
+                    fast_path_results, search_record = find_answered_search(
+                        trace, 
+                        None if image_path else lambda: lookup_products(product_collection, query_product, cache=product_card_cache), 
+                        product_search_collection, normalized_query, force_refresh_product)
+
+                    if fast_path_results is not None:
+                        trace.update(source='fast_path')
+                        keep_search('product_search', new_fast_path_state(query_product, fast_path_results))
+                    elif search_record is not None:
+                        trace.update(source='cache', search_id=search_record['search_id'])
+                        keep_search('product_search', new_search_state(search_record['search_id'], 
+                                                                       query_product, 
+                                                                       [result.get('score', 0) for result in search_record['result']], 
+                                                                       search_record.get('ai_response', ''), 
+                                                                       search_record['cached_at']))
+                    else:
+                        search_id = str(uuid.uuid4())
+                        thread_id = str(uuid.uuid4())
+
+                        trace.update(source='agent', search_id=search_id, thread_id=thread_id)
+                        start_search_job('product_search', query_product, get_product_ids, (search_id, thread_id, query_product, image_path), 
+                                         product_search_collection, normalized_query, trace)
+
+                    if 'product_search' in st.session_state:
+                        st.session_state['product_search']['trace'] = trace
+
+        display_search_history('product_search')
+        display_search_notice('product_search')
+        if 'product_search_job' in st.session_state:
+            # The polling fragment never waits for thumbnail downloads; they show once cached
+            display_search_job('product_search', 'uuid', partial(display_product_grid, thumbnail_wait=0))
+        if 'product_search' in st.session_state:
+            display_search_results('product_search', 
+                                   product_search_collection, 
+                                   'uuid', 
+                                   display_product_grid, 
+                                   "### 🛍️ Product Search Results")
+
+    # Batch Search tab
+    with tabs[2]:
+        st.markdown("""
+        ##### Batch Search 📋
 
-                    log = wait_for_log(thread_id, timeout=30)
+        Run many supplier or product searches at once. Upload a CSV with a `query` column; for product searches
+        an optional `image` column can name images uploaded alongside it. Queries run side by side and the top
+        results of each are collected into one table you can download.
+        """, unsafe_allow_html=True)
 
-                    if log is None:
-                        st.error("Failed to retrieve the log entry within the timeout period.")
-                    else:
-                        token_usage = log['token_usage']
-                        ai_answer = log['ai_response']
-                        st.success(f"🤖: {ai_answer}")
-                        st.divider()
-
-                        critiria = {"search_id": search_id}
-                        search_record = product_search_collection.find_one(critiria)
-
-                        result_list = search_record.get('result')
-                        if result_list is not None:
-                            length = len(result_list)
-                        else:
-                            length = 0
-                            
-                        if length > 0:
-                            product_uuids = [result['uuid'] for result in result_list]
-                            reasons = [result['reason'] for result in result_list]
-                            contents = [result['content'] for result in result_list]
-                            scores = [result['score'] for result in result_list]
-                            scores = format_scores(scores)
-
-                            display_limit = 30
-                            display_product_grid(product_uuids[:display_limit], 
-                                                reasons[:display_limit], 
-                                                contents[:display_limit],
-                                                scores[:display_limit])
-                        else:
-                            st.markdown("### 🛍️ Product Search Results")
-                            st.markdown("##### Apologies, no matching results were found. Please try adjusting your search criteria or keywords.")
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            batch_kind = st.radio("Search for", 
+                                  ["supplier", "product"], 
+                                  format_func=str.title, 
+                                  horizontal=True, 
+                                  key="batch_kind")
+            query_file = st.file_uploader("Query file (CSV)", type=["csv"], key="batch_query_file")
+            batch_images = []
+            if batch_kind == "product":
+                batch_images = st.file_uploader("Images named in the 'image' column", 
+                                                type=["jpg", "jpeg", "png"], 
+                                                accept_multiple_files=True, 
+                                                key="batch_images")
+        with col2:
+            run_batch_button = st.button(label='Run Batch', 
+                                         key="run_batch_button", 
+                                         help="Click to run every query in the file", 
+                                         disabled=query_file is None, 
+                                         use_container_width=True)
+            force_refresh_batch = st.checkbox("Force refresh", 
+                                              key="force_refresh_batch", 
+                                              help="Ignore cached results and run new searches")
+            st.download_button("Example file", 
+                               "query\nFactory in Spain\nSupplier with turnover higher than 5 millions\n", 
+                               file_name="batch_queries.csv", 
+                               mime="text/csv", 
+                               use_container_width=True)
+
+        if run_batch_button and query_file is not None:
+            cancel_batch(notify=False)
+            try:
+                rows = read_queries(query_file.getvalue(), {image.name: image.getvalue() for image in batch_images or []})
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                start_batch(batch_kind, rows, force_refresh_batch)
+
+        display_search_notice('batch_search')
+        if 'batch_search' in st.session_state:
+            if st.session_state['batch_search'].finished:
+                display_batch_results(st.session_state['batch_search'])
+            else:
+                display_batch_progress()
+
+    if st.sidebar.toggle("Show search timing", key="show_search_metrics") and 'last_search_metrics' in st.session_state:
+        display_search_metrics(st.session_state['last_search_metrics'])
 else:
     st.stop()  # Don't run the rest of the app.
\ No newline at end of file
@@ -0,0 +1,56 @@
+import os
+import re
+import unicodedata
+from datetime import datetime, timedelta
+
+QUERY_CACHE_MAX_AGE_MINUTES = float(os.getenv("QUERY_CACHE_MAX_AGE_MINUTES", 60))
+
+_PUNCTUATION = re.compile(r"[^\w\s]", flags=re.UNICODE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """
+    Folds case, punctuation and whitespace so equivalent queries share a cache key.
+
+    "Bunny  Dress!" and "bunny dress" both normalize to "bunny dress".
+    """
+    query = unicodedata.normalize("NFKC", query or "").casefold()
+    query = _PUNCTUATION.sub(" ", query)
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+def find_cached_search(collection, normalized_query: str, max_age_minutes: float = QUERY_CACHE_MAX_AGE_MINUTES, projection=None):
+    """
+    Returns the most recent completed search for `normalized_query`, if still fresh.
+
+    Args:
+        collection: `supplier_search_history` or `product_search_history`.
+        normalized_query (str): The output of `normalize_query`.
+        max_age_minutes (float): How old a stored result may be to be reused.
+        projection (dict, optional): Fields to return; defaults to the whole document.
+
+    Returns:
+        dict | None: The search-history document, including `result` and `ai_response`.
+    """
+    if not normalized_query or max_age_minutes <= 0:
+        return None
+
+    criteria = {
+        "normalized_query": normalized_query,
+        "cached_at": {"$gte": datetime.utcnow() - timedelta(minutes=max_age_minutes)},
+        "result.0": {"$exists": True},
+    }
+    return collection.find_one(criteria, projection, sort=[("cached_at", -1)])
+
+
+def remember_search(collection, search_id: str, normalized_query: str, ai_response: str):
+    """Tags a completed search so later identical queries can reuse it."""
+    if not normalized_query:
+        return
+    collection.update_one(
+        {"search_id": search_id},
+        {"$set": {"normalized_query": normalized_query,
+                  "ai_response": ai_response,
+                  "cached_at": datetime.utcnow()}},
+    )
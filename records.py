@@ -0,0 +1,105 @@
+from bson import ObjectId
+from bson.errors import InvalidId
+
+# Only the fields rendered by display_supplier_record / display_product_record
+SUPPLIER_CARD_PROJECTION = {
+    "_id": 1,
+    "System.ID": 1,
+    "SupplierBasic.Demographics.EntityFullName": 1,
+    "SupplierBasic.Demographics.RegistrationCountry": 1,
+    "SupplierBasic.Demographics.YearEstablished": 1,
+    "SupplierBasic.Demographics.HeadquarterAddress": 1,
+}
+
+PRODUCT_CARD_PROJECTION = {
+    "_id": 1,
+    "product_id": 1,
+    "item_description": 1,
+    "product_family": 1,
+    "product_category": 1,
+    "has_image": 1,
+    "image_url": 1,
+}
+
+
+def _from_cache(cache, keys):
+    unique_keys = list(dict.fromkeys(keys))
+    if cache is None:
+        return {}, unique_keys
+    return cache.get_many(unique_keys)
+
+
+def _in_rank_order(ids, records_by_key):
+    records = [records_by_key.get(key) for key in ids]
+    missing = [key for key, record in zip(ids, records) if record is None]
+    return records, missing
+
+
+def fetch_supplier_records(collection, supplier_ids, cache=None, fallback=None):
+    """
+    Fetches the card fields of many suppliers in a single round trip.
+
+    Args:
+        collection: The supplier collection (`sub_gold`) or its card summary (`sub_gold_card`).
+        supplier_ids (list): Supplier `System.ID`s in ranking order.
+        cache (CardCache, optional): Served first; only misses go to MongoDB.
+        fallback (optional): Collection queried for IDs `collection` does not
+            have, e.g. `sub_gold` behind a summary that has not caught up yet.
+
+    Returns:
+        tuple[list, list]: The records aligned with `supplier_ids` (None where no
+        record exists) and the list of IDs that had no matching record.
+    """
+    if not supplier_ids:
+        return [], []
+
+    records_by_key, to_fetch = _from_cache(cache, supplier_ids)
+    for source in [collection, fallback]:
+        if not to_fetch or source is None:
+            continue
+        cursor = source.find({"System.ID": {"$in": to_fetch}}, SUPPLIER_CARD_PROJECTION)
+        fetched = {record["System"]["ID"]: record for record in cursor}
+        records_by_key.update(fetched)
+        if cache is not None:
+            cache.put_many(fetched)
+        to_fetch = [key for key in to_fetch if key not in fetched]
+    return _in_rank_order(supplier_ids, records_by_key)
+
+
+def fetch_product_records(collection, product_uuids, cache=None, fallback=None):
+    """
+    Fetches the card fields of many products in a single round trip.
+
+    Args:
+        collection: The product collection (`sub_gold_product`) or its card summary (`sub_gold_product_card`).
+        product_uuids (list): Product ObjectId strings in ranking order.
+        cache (CardCache, optional): Served first; only misses go to MongoDB.
+        fallback (optional): Collection queried for IDs `collection` does not have.
+
+    Returns:
+        tuple[list, list]: The records aligned with `product_uuids` (None where no
+        record exists or the ID is not a valid ObjectId) and the list of missing IDs.
+    """
+    if not product_uuids:
+        return [], []
+
+    product_uuids = [str(product_uuid) for product_uuid in product_uuids]
+    records_by_key, to_fetch = _from_cache(cache, product_uuids)
+
+    object_ids = []
+    for product_uuid in to_fetch:
+        try:
+            object_ids.append(ObjectId(product_uuid))
+        except (InvalidId, TypeError):
+            continue
+
+    for source in [collection, fallback]:
+        if not object_ids or source is None:
+            continue
+        cursor = source.find({"_id": {"$in": object_ids}}, PRODUCT_CARD_PROJECTION)
+        fetched = {str(record["_id"]): record for record in cursor}
+        records_by_key.update(fetched)
+        if cache is not None:
+            cache.put_many(fetched)
+        object_ids = [object_id for object_id in object_ids if str(object_id) not in fetched]
+    return _in_rank_order(product_uuids, records_by_key)
@@ -0,0 +1,136 @@
+"""
+Builds the supplier and product result grids as a single HTML string.
+
+The page emits the whole grid with one `st.markdown` call instead of a
+`st.columns` row, two markdown blocks and an expander per result. Raw agent
+output is only previewed here; the page loads the full text on request.
+Every value taken from a record or from the agent is HTML-escaped.
+"""
+import os
+from html import escape
+from string import Template
+
+# Characters of each result's raw output shown inline; the full text is loaded on request
+RAW_PREVIEW_CHARS = int(os.getenv("RAW_PREVIEW_CHARS", 160))
+
+SUPPLIER_DETAILS_URL = "https://stasduseanplfs2uatui.z23.web.core.windows.net/supplier/"
+
+# No blank lines or 4-space indents: the markdown parser would end the HTML block there
+GRID_CSS = """<style>
+.result-grid{display:grid;grid-template-columns:repeat(auto-fill,minmax(min(100%,420px),1fr));gap:1rem;margin-bottom:1rem;}
+.result-card{border:1px solid #d1d1d1;padding:10px 20px;border-radius:10px;height:150px;background-color:#f9f9f9;box-shadow:0 2px 5px rgba(0,0,0,0.1);color:#2c3e50;font-size:14px;}
+.result-card h3{margin:0 0 5px 0;padding:0;max-height:35px;overflow-y:auto;color:#2c3e50;font-size:20px;}
+.result-card .row{display:flex;justify-content:space-between;align-items:center;margin:5px 0;}
+.result-card .row p{margin:0;}
+.result-card .scroll{max-height:30px;overflow-y:auto;}
+.result-card button{padding:10px 20px;background-color:#2980b9;color:white;border:none;border-radius:5px;cursor:pointer;font-size:14px;}
+.result-reason{border:1px solid #d1d1d1;border-radius:5px;padding:10px;background-color:#d4f5d4;color:#2c3e50;font-size:14px;margin-top:10px;min-height:85px;}
+.result-card .thumb{float:right;width:96px;height:96px;object-fit:contain;margin-left:10px;border-radius:6px;background-color:#fff;}
+.result-preview{margin-top:6px;color:#5f6b7a;font-size:12px;max-height:54px;overflow:hidden;}
+</style>"""
+
+SUPPLIER_CARD = Template(
+    '<div class="result-card"><h3>$name</h3>'
+    '<div class="row"><p><strong>🆔 ID:</strong> $id</p><p><strong>🌍 Country:</strong> $country</p>'
+    '<p><strong>📅 Established:</strong> $established</p></div>'
+    '<div class="row"><p class="scroll"><strong>🏢 HQ:</strong> $address</p>'
+    '<a href="$details_url" target="_blank"><button>Details</button></a></div></div>'
+)
+
+PRODUCT_CARD = Template(
+    '<div class="result-card">$thumbnail<h3>$name</h3>'
+    '<div class="row"><p><strong>🆔 ID:</strong> $id</p><p><strong>📦 Family:</strong> $family</p></div>'
+    '<div class="row"><p class="scroll"><strong>🏷️ Category:</strong> $category</p>$image_link</div></div>'
+)
+
+IMAGE_LINK = Template('<a href="$url" target="_blank"><button>Image</button></a>')
+
+THUMBNAIL = Template('<a href="$url" target="_blank"><img class="thumb" src="$src" alt="Product image"></a>')
+
+CELL = Template(
+    '<div class="result-cell">$card'
+    '<div class="result-reason"><strong>Score:</strong> $score<br><strong>Reason:</strong> $reason</div>'
+    '$preview</div>'
+)
+
+PREVIEW = Template('<div class="result-preview">$text</div>')
+
+
+def _text(value):
+    # Newlines become <br> so multi-line values cannot end the HTML block
+    return escape(str(value)).replace("\r", "").replace("\n", "<br>")
+
+
+def supplier_card_html(record):
+    demographics = record['SupplierBasic']['Demographics']
+    supplier_id = record['System']['ID']
+    return SUPPLIER_CARD.substitute(
+        name=_text(demographics['EntityFullName']),
+        id=_text(supplier_id),
+        country=_text(demographics['RegistrationCountry']),
+        established=_text(demographics.get('YearEstablished', 'Unknown')),
+        address=_text(demographics.get('HeadquarterAddress', 'Not specified')),
+        details_url=escape(f"{SUPPLIER_DETAILS_URL}{supplier_id}"),
+    )
+
+
+def product_image_url(record):
+    """The full image of a product, without a SAS, or None when it has none."""
+    if record.get('has_image') != "yes":
+        return None
+    return record.get('image_url')
+
+
+def product_card_html(record, thumbnails=None, sign_url=None):
+    # A thumbnail, when one is ready, links to the full image in place of the button
+    image_url = product_image_url(record)
+    thumbnail = (thumbnails or {}).get(image_url)
+    link_url = sign_url(image_url) if image_url is not None and sign_url is not None else image_url
+    image_link = ""
+    if image_url is not None and thumbnail is None:
+        image_link = IMAGE_LINK.substitute(url=escape(link_url))
+    return PRODUCT_CARD.substitute(
+        thumbnail=THUMBNAIL.substitute(url=escape(link_url), src=thumbnail) if thumbnail else "",
+        name=_text(record['item_description'].replace("  ", " ")),
+        id=_text(record['product_id']),
+        family=_text(record.get('product_family', 'Not specified')),
+        category=_text(record.get('product_category', 'Not specified')),
+        image_link=image_link,
+    )
+
+
+def _preview(content, preview_chars):
+    if not content or preview_chars <= 0:
+        return ""
+    text = " ".join(str(content).split())
+    if len(text) > preview_chars:
+        text = text[:preview_chars].rstrip() + "…"
+    return PREVIEW.substitute(text=_text(text))
+
+
+def grid_html(cards, reasons, contents, scores, preview_chars=RAW_PREVIEW_CHARS):
+    """
+    Lays out pre-rendered cards with their score, reason and a short raw-output preview.
+
+    Args:
+        cards (list): Card HTML per result, from `supplier_card_html` or `product_card_html`.
+        reasons (list): The agent's reason per result.
+        contents (list): The agent's raw output per result, possibly already truncated.
+        scores (list): Display score per result.
+        preview_chars (int): Length of the inline preview; 0 leaves it out.
+
+    Returns:
+        str: The grid, ready for `st.markdown(..., unsafe_allow_html=True)`.
+    """
+    cells = [CELL.substitute(card=card, score=f"{score:.2f}", reason=_text(reason), preview=_preview(content, preview_chars))
+             for card, reason, content, score in zip(cards, reasons, contents, scores)]
+    return f'{GRID_CSS}<div class="result-grid">{"".join(cells)}</div>'
+
+
+def supplier_grid_html(records, reasons, contents, scores, preview_chars=RAW_PREVIEW_CHARS):
+    return grid_html([supplier_card_html(record) for record in records], reasons, contents, scores, preview_chars)
+
+
+def product_grid_html(records, reasons, contents, scores, preview_chars=RAW_PREVIEW_CHARS, thumbnails=None, sign_url=None):
+    # `thumbnails` maps `product_image_url(record)` to a data URI; `sign_url` adds a read SAS to image links
+    return grid_html([product_card_html(record, thumbnails, sign_url) for record in records], reasons, contents, scores, preview_chars)
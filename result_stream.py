@@ -0,0 +1,150 @@
+import threading
+import time
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from log_waiter import CHANGE_STREAM_UNSUPPORTED
+
+# Upper bound on the entries fetched per read; far above what the agent returns
+MAX_SLICE = 10000
+
+
+class ResultWatcher:
+    """
+    Wakes result readers whenever the agent writes to their search-history document.
+
+    One change stream over the collection is shared by every search followed
+    in the process; changes are dispatched to readers by `search_id`. When
+    change streams are not available (standalone mongod) readers are never
+    woken early and poll with their backoff instead.
+
+    Args:
+        collection: `supplier_search_history` or `product_search_history`.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+        self._lock = threading.Lock()
+        self._wakes = {}
+        self._watcher = None
+        self._stream_ready = threading.Event()
+        self._stream_unsupported = False
+
+    def register(self, search_id):
+        """
+        Starts dispatching changes of `search_id`'s document.
+
+        Returns:
+            threading.Event: Set on each change; pass it to `unregister` when done.
+        """
+        wake = threading.Event()
+        with self._lock:
+            self._wakes.setdefault(search_id, []).append(wake)
+        if not self._stream_unsupported:
+            self._ensure_watcher()
+        return wake
+
+    def unregister(self, search_id, wake):
+        with self._lock:
+            wakes = self._wakes.get(search_id, [])
+            if wake in wakes:
+                wakes.remove(wake)
+            if not wakes:
+                self._wakes.pop(search_id, None)
+
+    def stats(self):
+        return {
+            "active_mode": "stream" if self._stream_ready.is_set() else "poll",
+            "following": sum(len(wakes) for wakes in self._wakes.values()),
+        }
+
+    def _ensure_watcher(self):
+        with self._lock:
+            if self._watcher is None or not self._watcher.is_alive():
+                self._stream_ready.clear()
+                self._watcher = threading.Thread(target=self._watch,
+                                                 name=f"search-results-{self.collection.name}",
+                                                 daemon=True)
+                self._watcher.start()
+            return self._watcher
+
+    def _watch(self):
+        # Only the search_id of the looked-up document is shipped, not its results
+        pipeline = [
+            {"$match": {"operationType": {"$in": ["insert", "replace", "update"]},
+                        "fullDocument.search_id": {"$exists": True}}},
+            {"$project": {"fullDocument.search_id": 1}},
+        ]
+        try:
+            with self.collection.watch(pipeline, full_document="updateLookup") as stream:
+                self._stream_ready.set()
+                for change in stream:
+                    self._deliver((change.get("fullDocument") or {}).get("search_id"))
+        except OperationFailure as e:
+            if e.code == CHANGE_STREAM_UNSUPPORTED or "replica set" in str(e):
+                self._stream_unsupported = True
+        except PyMongoError:
+            # Non-resumable failure; the next register() starts a new watcher
+            pass
+        finally:
+            self._stream_ready.clear()
+            self._wake_all()
+
+    def _deliver(self, search_id):
+        with self._lock:
+            wakes = list(self._wakes.get(search_id, []))
+        for wake in wakes:
+            wake.set()
+
+    def _wake_all(self):
+        with self._lock:
+            wakes = [wake for wakes in self._wakes.values() for wake in wakes]
+        for wake in wakes:
+            wake.set()
+
+
+def iter_new_results(collection, search_id, until, timeout=60, watcher=None,
+                     min_poll_interval=0.2, max_poll_interval=2.0, backoff=1.5):
+    """
+    Yields result entries of a search-history document as the agent appends them.
+
+    Only entries not seen yet are read, using a `$slice` projection. A shared
+    ResultWatcher wakes the reader early when change streams are available;
+    otherwise reads back off from `min_poll_interval` to `max_poll_interval`.
+
+    Args:
+        collection: `supplier_search_history` or `product_search_history`.
+        search_id (str): The search to follow.
+        until (callable): Returns True once the search has finished; a last read
+            is made after that so trailing entries are not lost.
+        timeout (float): Maximum number of seconds to follow the document.
+        watcher (ResultWatcher, optional): The process's watcher for `collection`.
+
+    Yields:
+        list: The entries appended since the previous yield, in ranking order.
+    """
+    wake = watcher.register(search_id) if watcher is not None else threading.Event()
+
+    seen = 0
+    interval = min_poll_interval
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            finished = until()
+            record = collection.find_one({"search_id": search_id},
+                                         {"_id": 0, "search_id": 1, "result": {"$slice": [seen, MAX_SLICE]}})
+            new_entries = (record or {}).get("result") or []
+            if new_entries:
+                seen += len(new_entries)
+                interval = min_poll_interval
+                yield new_entries
+
+            if finished or time.monotonic() >= deadline:
+                return
+            wake.wait(timeout=interval)
+            wake.clear()
+            interval = min(interval * backoff, max_poll_interval)
+    finally:
+        if watcher is not None:
+            watcher.unregister(search_id, wake)
@@ -0,0 +1,150 @@
+"""
+Admission control and single-flight coalescing for agent searches.
+
+Every agent search of the process goes through one SearchCoordinator:
+
+- A search identical to one still in flight (same kind and normalized
+  query) does not call the agent again. The session joins the running job
+  and shares its search_id, so both render the same search-history document.
+- New searches queue on the shared SearchJobRunner, whose `SEARCH_WORKERS`
+  bound is the number of agent calls in flight at once. Beyond
+  `SEARCH_MAX_QUEUED` waiting searches, new ones are turned away rather
+  than left to wait for minutes.
+"""
+import os
+import threading
+import time
+
+from search_jobs import CANCELLED, FINISHED_STATUSES
+
+# Searches allowed to wait for a slot; 0 for no limit
+SEARCH_MAX_QUEUED = int(os.getenv("SEARCH_MAX_QUEUED", 100))
+
+
+class SearchQueueFull(Exception):
+    """Raised when a new search arrives while the queue is at `SEARCH_MAX_QUEUED`."""
+
+
+class SharedSearch:
+    """
+    One session's handle on a SearchJob, which other sessions may have joined.
+
+    Reads like the job itself, except that cancelling only lets go of this
+    handle: the agent call stops once no session is waiting for it.
+
+    Args:
+        coordinator (SearchCoordinator): The coordinator that handed out the job.
+        key (tuple): The coalescing key, or None for a search that is never shared.
+        job (SearchJob): The job doing the work.
+        trace (SearchTrace): This session's trace; the job's own for the session that started it.
+    """
+
+    def __init__(self, coordinator, key, job, trace):
+        self.key = key
+        self.job = job
+        self.trace = trace
+        self.shared = trace is not job.trace
+        self.created_at = time.time()
+        self._coordinator = coordinator
+        self._cancelled = False
+
+    def __getattr__(self, name):
+        # search_id, query, result, error and the rest come from the job
+        return getattr(self.job, name)
+
+    @property
+    def status(self):
+        return CANCELLED if self._cancelled else self.job.status
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATUSES
+
+    def elapsed(self):
+        end = self.job.finished_at if self.job.finished and not self._cancelled else time.time()
+        return end - self.created_at
+
+    def queue_position(self):
+        """1 for the next search to start, or None once this one is running."""
+        return self._coordinator.runner.queue_position(self.job)
+
+    def cancel(self):
+        if not self._cancelled:
+            self._cancelled = True
+            self._coordinator._release(self)
+
+
+class SearchCoordinator:
+    """
+    Hands out agent searches, coalescing identical ones and bounding the queue.
+
+    Args:
+        runner (SearchJobRunner): Runs the searches; its `max_workers` is the concurrency limit.
+        max_queued (int): Searches allowed to wait for a slot; 0 for no limit.
+    """
+
+    def __init__(self, runner, max_queued=SEARCH_MAX_QUEUED):
+        self.runner = runner
+        self.max_queued = max_queued
+        self._lock = threading.Lock()
+        # key -> [job, sessions still waiting for it]
+        self._inflight = {}
+        self._coalesced = 0
+        self._rejected = 0
+
+    def submit(self, key, job, task):
+        """
+        Starts `job`, or joins the in-flight job with the same key instead.
+
+        Args:
+            key (tuple): What makes two searches identical, e.g. (kind, normalized query);
+                None for searches that must not be shared, such as image searches.
+            job (SearchJob): The job to run if nothing identical is in flight.
+            task (callable): `task(job)`, as for `SearchJobRunner.submit`.
+
+        Returns:
+            SharedSearch: This session's handle. When joined, `job` is discarded and
+            `job.trace` is re-pointed at the running search with source 'shared'.
+
+        Raises:
+            SearchQueueFull: If `job` would have to queue behind `max_queued` others.
+        """
+        with self._lock:
+            entry = self._inflight.get(key) if key is not None else None
+            if entry is not None and not entry[0].finished and not entry[0].cancel_event.is_set():
+                entry[1] += 1
+                self._coalesced += 1
+                running = entry[0]
+                job.trace.update(source="shared", search_id=running.search_id, thread_id=running.thread_id)
+                return SharedSearch(self, key, running, job.trace)
+
+            if self.max_queued and self.runner.stats()["queued"] >= self.max_queued:
+                self._rejected += 1
+                raise SearchQueueFull(f"{self.max_queued} searches are already waiting; please try again shortly.")
+            if key is not None:
+                self._inflight[key] = [job, 1]
+        self.runner.submit(job, task, on_done=lambda job: self._forget(key, job))
+        return SharedSearch(self, key, job, job.trace)
+
+    def _release(self, shared):
+        with self._lock:
+            entry = self._inflight.get(shared.key)
+            if entry is not None and entry[0] is shared.job:
+                entry[1] -= 1
+                if entry[1] > 0:
+                    return
+                del self._inflight[shared.key]
+        shared.job.cancel()
+
+    def _forget(self, key, job):
+        with self._lock:
+            entry = self._inflight.get(key)
+            if entry is not None and entry[0] is job:
+                del self._inflight[key]
+
+    def stats(self):
+        with self._lock:
+            inflight = len(self._inflight)
+            sessions = sum(count for _, count in self._inflight.values())
+            coalesced, rejected = self._coalesced, self._rejected
+        return {"inflight": inflight, "sessions": sessions, "coalesced": coalesced, "rejected": rejected}
@@ -0,0 +1,109 @@
+"""
+The steps of one supplier or product search, shared by the Search page and the benchmark.
+
+A search is answered from the fast path, then the query cache, and only
+then by the agent, whose answer is recorded so identical queries can reuse it.
+"""
+from query_cache import find_cached_search, remember_search
+from search_history import fetch_result_scores
+from search_metrics import span
+
+# Enough of a cached search to page through it without reading the result bodies
+CACHED_SEARCH_PROJECTION = {'_id': 0, 'search_id': 1, 'ai_response': 1, 'cached_at': 1, 'result.score': 1}
+
+SYSTEM_PROMPT = """You are LFX Supplier and Product Search Assistant, a highly efficient, professional assistant specializing in performing comprehensive searches.
+Your primary role is to provide users with helpful, polite, and accurate assistance tailored to their search needs.
+- Utilize the 'supplier_search' tool to address user queries related to factories or suppliers, offering detailed information and relevant insights.
+- Utilize the 'product_search' tool to address user queries related to products, providing comprehensive details and relevant data.
+Maintain a professional demeanor, ensure clarity in your responses, and strive to meet user expectations effectively.
+"""
+
+SUPPLIER_PROMPT = """
+I would like to perform a supplier search with the following details:
+
+- query: {query}
+
+Please execute the supplier_search function using these parameters.
+"""
+
+PRODUCT_PROMPT = """
+I would like to perform a product search with the following details:
+
+- query: {query}
+- image path: {image_path}
+
+Please execute the product_search function using these parameters.
+"""
+
+
+def supplier_search_payload(search_id, thread_id, query):
+    """The agent request for a supplier search whose results go to `search_id`."""
+    return {'message': SUPPLIER_PROMPT.format(query=query),
+            'user_id': 'iamadmin',
+            'thread_id': thread_id,
+            'additional_config': {'search_id': search_id},
+            'ai_role': SYSTEM_PROMPT}
+
+
+def product_search_payload(search_id, thread_id, query=None, image_path=None):
+    """The agent request for a product search by text, by an uploaded image's blob URL, or both."""
+    return {'message': PRODUCT_PROMPT.format(query=query, image_path=image_path),
+            'user_id': 'iamadmin',
+            'thread_id': thread_id,
+            'additional_config': {'search_id': search_id},
+            'ai_role': SYSTEM_PROMPT}
+
+
+def find_answered_search(trace, lookup, search_collection, normalized_query, force_refresh=False):
+    """
+    Looks for an answer that needs no agent call.
+
+    Args:
+        trace (SearchTrace): Receives the 'fast_path' and 'query_cache' spans; may be None.
+        lookup (callable): The fast-path lookup, returning results or None; None to skip it.
+        search_collection: `supplier_search_history` or `product_search_history`.
+        normalized_query (str): The output of `normalize_query`; empty for searches never cached.
+        force_refresh (bool): Skip the query cache.
+
+    Returns:
+        tuple: (fast-path results, cached search-history document); at most one is not None.
+    """
+    fast_path_results, search_record = None, None
+    if lookup is not None:
+        with span(trace, 'fast_path'):
+            fast_path_results = lookup()
+    if fast_path_results is None and not force_refresh:
+        with span(trace, 'query_cache'):
+            search_record = find_cached_search(search_collection, normalized_query, projection=CACHED_SEARCH_PROJECTION)
+    return fast_path_results, search_record
+
+
+def run_agent_search(job, agent_call, args, log_waiter, search_collection, normalized_query, timeout):
+    """
+    Calls the agent, waits for its log entry and records the search.
+
+    Args:
+        job (SearchJob): The search; its trace receives the spans and token usage.
+        agent_call (callable): Posts the request, called as `agent_call(*args)`.
+        args (tuple): Arguments for `agent_call`.
+        log_waiter (LogWaiter): Waits for the agent_log entry of `job.thread_id`.
+        search_collection: Where the agent writes the results of `job.search_id`.
+        normalized_query (str): Tagged on the search for the query cache.
+        timeout (float): Seconds to wait for the log entry.
+
+    Returns:
+        dict | None: The result scores and the agent's answer, or None on timeout or cancel.
+    """
+    with span(job.trace, 'agent_post'):
+        agent_call(*args)
+    with span(job.trace, 'log_wait'):
+        log = log_waiter.wait(job.thread_id, timeout=timeout, cancel_event=job.cancel_event)
+    if log is None:
+        return None
+    job.trace.update(token_usage=log['token_usage'])
+
+    # Only the scores are read here; result bodies are fetched page by page
+    with span(job.trace, 'history_fetch'):
+        scores = fetch_result_scores(search_collection, job.search_id)
+        remember_search(search_collection, job.search_id, normalized_query, log['ai_response'])
+    return {'scores': scores, 'ai_answer': log['ai_response']}
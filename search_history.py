@@ -0,0 +1,65 @@
+def fetch_result_scores(collection, search_id):
+    """
+    Returns the scores of every result of a search, without the result bodies.
+
+    Args:
+        collection: `supplier_search_history` or `product_search_history`.
+        search_id (str): The search to read.
+
+    Returns:
+        list: The raw scores in ranking order.
+    """
+    record = collection.find_one({"search_id": search_id}, {"_id": 0, "result.score": 1})
+    return [result.get("score", 0) for result in (record or {}).get("result") or []]
+
+
+def fetch_result_page(collection, search_id, skip, limit, content_chars=None):
+    """
+    Returns one page of a search's result list, read server-side with `$slice`.
+
+    Args:
+        collection: `supplier_search_history` or `product_search_history`.
+        search_id (str): The search to read.
+        skip (int): Number of ranked results before the page.
+        limit (int): Page size.
+        content_chars (int, optional): Truncate each result's raw `content` to
+            this many characters on the server. None returns it in full.
+
+    Returns:
+        list: The result entries of the page in ranking order.
+    """
+    if content_chars is None:
+        record = collection.find_one({"search_id": search_id},
+                                     {"_id": 0, "search_id": 1, "result": {"$slice": [skip, limit]}})
+        return (record or {}).get("result") or []
+
+    pipeline = [
+        {"$match": {"search_id": search_id}},
+        {"$limit": 1},
+        {"$project": {"_id": 0, "result": {"$map": {
+            "input": {"$slice": [{"$ifNull": ["$result", []]}, skip, limit]},
+            "as": "entry",
+            "in": {"$mergeObjects": ["$$entry", {
+                "content": {"$substrCP": [{"$ifNull": ["$$entry.content", ""]}, 0, content_chars]}
+            }]},
+        }}}},
+    ]
+    records = list(collection.aggregate(pipeline))
+    return records[0]["result"] if records else []
+
+
+def fetch_result_content(collection, search_id, index):
+    """
+    Returns the full raw `content` of one result, read with a one-element `$slice`.
+
+    Args:
+        collection: `supplier_search_history` or `product_search_history`.
+        search_id (str): The search to read.
+        index (int): The result's position in the ranking.
+
+    Returns:
+        str | None: The content, or None when the result does not exist.
+    """
+    record = collection.find_one({"search_id": search_id}, {"_id": 0, "result": {"$slice": [index, 1]}})
+    entries = (record or {}).get("result") or []
+    return entries[0].get("content", "") if entries else None
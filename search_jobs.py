@@ -0,0 +1,143 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Searches running at once per process; later ones queue, which caps the load on the agent endpoint
+SEARCH_WORKERS = int(os.getenv("SEARCH_WORKERS", 16))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+TIMED_OUT = "timeout"
+CANCELLED = "cancelled"
+FINISHED_STATUSES = {DONE, FAILED, TIMED_OUT, CANCELLED}
+
+
+class SearchJob:
+    """
+    One agent search running in the background, polled by the session that started it.
+
+    Args:
+        kind (str): 'supplier' or 'product'.
+        search_id (str): The search-history document the agent writes.
+        thread_id (str): The agent_log entry to wait for.
+        query (str, optional): Shown while the job runs.
+        trace (SearchTrace, optional): Receives the job's spans.
+    """
+
+    def __init__(self, kind, search_id, thread_id, query=None, trace=None):
+        self.kind = kind
+        self.search_id = search_id
+        self.thread_id = thread_id
+        self.query = query
+        self.trace = trace
+        self.status = QUEUED
+        self.result = None
+        # Result entries streamed in while the job runs, in ranking order
+        self.received = []
+        self.error = None
+        self.cancel_event = threading.Event()
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._future = None
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATUSES
+
+    def elapsed(self):
+        return (self.finished_at or time.time()) - self.created_at
+
+    def cancel(self):
+        """Stops waiting for the agent; a job still in the queue never starts."""
+        self.cancel_event.set()
+        if self._future is not None:
+            self._future.cancel()
+
+    def _finish(self, status):
+        self.finished_at = time.time()
+        self.status = status
+
+
+class SearchJobRunner:
+    """
+    Runs SearchJobs on a bounded thread pool shared by every session.
+
+    Jobs beyond `max_workers` wait in the queue with status 'queued'.
+
+    Args:
+        max_workers (int): Searches running at once across the process.
+    """
+
+    def __init__(self, max_workers=SEARCH_WORKERS):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="search-job")
+        self._lock = threading.Lock()
+        # Insertion-ordered, like the executor's queue
+        self._jobs = {}
+
+    def submit(self, job, task, on_done=None):
+        """
+        Queues `task(job)`, which returns the job's result, or None when the agent timed out.
+
+        Args:
+            job (SearchJob): The job to run.
+            task (callable): Does the work on a worker thread.
+            on_done (callable, optional): Called with the job once it has finished,
+                on the worker thread or, for a job cancelled in the queue, on the
+                cancelling thread.
+
+        Returns:
+            SearchJob: `job`, for chaining.
+        """
+        with self._lock:
+            self._jobs[job] = None
+        job._future = self._executor.submit(self._run, job, task)
+        # Also fires for jobs cancelled before they started
+        job._future.add_done_callback(lambda future: self._done(job, future, on_done))
+        return job
+
+    def _done(self, job, future, on_done):
+        if future.cancelled():
+            job._finish(CANCELLED)
+        with self._lock:
+            self._jobs.pop(job, None)
+        if on_done is not None:
+            on_done(job)
+
+    @staticmethod
+    def _run(job, task):
+        if job.cancel_event.is_set():
+            job._finish(CANCELLED)
+            return
+        job.started_at = time.time()
+        job.status = RUNNING
+        if job.trace is not None:
+            job.trace.record('queue_wait', job.started_at - job.created_at)
+        try:
+            result = task(job)
+        except Exception as e:
+            job.error = e
+            job._finish(FAILED)
+            return
+        if job.cancel_event.is_set():
+            job._finish(CANCELLED)
+        elif result is None:
+            job._finish(TIMED_OUT)
+        else:
+            job.result = result
+            job._finish(DONE)
+
+    def stats(self):
+        with self._lock:
+            statuses = [job.status for job in self._jobs]
+        return {"queued": statuses.count(QUEUED), "running": statuses.count(RUNNING), "max_workers": self.max_workers}
+
+    def queue_position(self, job):
+        """1 for the next job to start, or None when `job` is not waiting."""
+        with self._lock:
+            queued = [queued_job for queued_job in self._jobs if queued_job.status == QUEUED]
+        return queued.index(job) + 1 if job in queued else None
@@ -0,0 +1,246 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging.handlers import RotatingFileHandler
+
+# JSONL trace log, off unless a path is set; rotated at the size limit
+SEARCH_METRICS_LOG = os.getenv("SEARCH_METRICS_LOG", "")
+SEARCH_METRICS_LOG_MAX_BYTES = int(os.getenv("SEARCH_METRICS_LOG_MAX_BYTES", 10 * 1024 * 1024))
+SEARCH_METRICS_LOG_BACKUPS = int(os.getenv("SEARCH_METRICS_LOG_BACKUPS", 5))
+METRICS_PORT = int(os.getenv("METRICS_PORT", 9464))
+
+# Histogram buckets in seconds, from a cached card fetch up to a slow agent round trip
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+
+class SearchTrace:
+    """
+    Timing spans and token usage for one search (or one page view of its results).
+
+    Spans may be recorded from the script thread and from worker threads.
+    Call `finish()` once to emit the trace as a JSONL line and into the
+    Prometheus registry.
+
+    Args:
+        kind (str): 'supplier' or 'product'.
+        event (str): 'search' for a new search, 'page_view' for a rerun of its results,
+            'batch' for one query of a batch search.
+        search_id (str, optional): Set later with `update()` when not known yet.
+    """
+
+    def __init__(self, kind, event="search", search_id=None):
+        self.kind = kind
+        self.event = event
+        self.search_id = search_id
+        self.thread_id = None
+        self.source = None
+        self.status = None
+        self.token_usage = None
+        self.render_bytes = None
+        self.spans = {}
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._finished = False
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.spans[name] = self.spans.get(name, 0.0) + elapsed
+
+    def record(self, name, seconds):
+        """Adds a span measured elsewhere, e.g. time spent in a queue."""
+        with self._lock:
+            self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def update(self, **fields):
+        for key, value in fields.items():
+            setattr(self, key, value)
+
+    def as_dict(self):
+        return {
+            "ts": datetime.now(timezone.utc).isoformat(),
+            "kind": self.kind,
+            "event": self.event,
+            "search_id": self.search_id,
+            "thread_id": self.thread_id,
+            "source": self.source,
+            "status": self.status,
+            "total_seconds": round(time.perf_counter() - self._start, 6),
+            "spans": {name: round(seconds, 6) for name, seconds in self.spans.items()},
+            "token_usage": self.token_usage,
+            "render_bytes": self.render_bytes,
+        }
+
+    def finish(self, status="ok"):
+        """Emits the trace once; later calls return the same record without re-emitting."""
+        if self._finished:
+            return self._record
+        self._finished = True
+        self.status = self.status or status
+        self._record = self.as_dict()
+        registry.observe(self._record)
+        _append_jsonl(self._record)
+        return self._record
+
+
+def span(trace, name):
+    """`trace.span(name)`, or a no-op when there is no trace."""
+    return trace.span(name) if trace is not None else nullcontext()
+
+
+_jsonl_lock = threading.Lock()
+_jsonl_logger = None
+
+
+def _append_jsonl(record):
+    global _jsonl_logger
+    if not SEARCH_METRICS_LOG:
+        return
+    with _jsonl_lock:
+        if _jsonl_logger is None:
+            handler = RotatingFileHandler(SEARCH_METRICS_LOG, maxBytes=SEARCH_METRICS_LOG_MAX_BYTES,
+                                          backupCount=SEARCH_METRICS_LOG_BACKUPS, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            _jsonl_logger = logging.getLogger("search_metrics.jsonl")
+            _jsonl_logger.addHandler(handler)
+            _jsonl_logger.setLevel(logging.INFO)
+            _jsonl_logger.propagate = False
+    _jsonl_logger.info(json.dumps(record, default=str))
+
+
+def _escape(value):
+    # Label values may come from user input; escape as the text format requires
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class MetricsRegistry:
+    """In-process counters and histograms rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._searches = {}
+        self._phases = {}
+        self._tokens = {}
+        self._render_bytes = {}
+        self._gauges = {}
+
+    def observe(self, record):
+        with self._lock:
+            key = (record["kind"], record["event"], record["source"] or "none", record["status"])
+            self._searches[key] = self._searches.get(key, 0) + 1
+
+            phases = dict(record["spans"], total=record["total_seconds"])
+            for phase, seconds in phases.items():
+                histogram = self._phases.setdefault((record["kind"], phase), [[0] * len(BUCKETS), 0, 0.0])
+                for i, bound in enumerate(BUCKETS):
+                    if seconds <= bound:
+                        histogram[0][i] += 1
+                histogram[1] += 1
+                histogram[2] += seconds
+
+            if record.get("render_bytes"):
+                self._render_bytes[record["kind"]] = self._render_bytes.get(record["kind"], 0) + record["render_bytes"]
+
+            for token_type, count in (record["token_usage"] or {}).items():
+                if isinstance(count, (int, float)):
+                    key = (record["kind"], token_type)
+                    self._tokens[key] = self._tokens.get(key, 0) + count
+
+    def register_gauge(self, name, help_text, collect):
+        """Adds a gauge whose samples (a {labels dict as tuple: value} mapping) come from `collect()`."""
+        with self._lock:
+            self._gauges[name] = (help_text, collect)
+
+    def render(self):
+        lines = ["# HELP search_requests_total Searches and result page views by outcome.",
+                 "# TYPE search_requests_total counter"]
+        with self._lock:
+            for (kind, event, source, status), count in sorted(self._searches.items()):
+                lines.append(f"search_requests_total{_labels(kind=kind, event=event, source=source, status=status)} {count}")
+
+            lines += ["# HELP search_phase_seconds Time spent in each phase of a search.",
+                      "# TYPE search_phase_seconds histogram"]
+            for (kind, phase), (buckets, count, total) in sorted(self._phases.items()):
+                for bound, bucket_count in zip(BUCKETS, buckets):
+                    lines.append(f"search_phase_seconds_bucket{_labels(kind=kind, phase=phase, le=bound)} {bucket_count}")
+                lines.append(f"search_phase_seconds_bucket{_labels(kind=kind, phase=phase, le='+Inf')} {count}")
+                lines.append(f"search_phase_seconds_count{_labels(kind=kind, phase=phase)} {count}")
+                lines.append(f"search_phase_seconds_sum{_labels(kind=kind, phase=phase)} {total}")
+
+            lines += ["# HELP search_tokens_total LLM tokens reported by the agent.",
+                      "# TYPE search_tokens_total counter"]
+            for (kind, token_type), count in sorted(self._tokens.items()):
+                lines.append(f"search_tokens_total{_labels(kind=kind, type=token_type)} {count}")
+
+            lines += ["# HELP search_render_bytes_total HTML bytes of result grids sent to browsers.",
+                      "# TYPE search_render_bytes_total counter"]
+            for kind, count in sorted(self._render_bytes.items()):
+                lines.append(f"search_render_bytes_total{_labels(kind=kind)} {count}")
+
+            gauges = list(self._gauges.items())
+
+        for name, (help_text, collect) in gauges:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+            try:
+                samples = collect()
+            except Exception:
+                continue
+            for labels, value in samples.items():
+                lines.append(f"{name}{_labels(**dict(labels))} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server_lock = threading.Lock()
+_server = None
+
+
+def start_metrics_server(port=METRICS_PORT):
+    """
+    Serves `/metrics` on `port` from a daemon thread, once per process.
+
+    Returns:
+        ThreadingHTTPServer | None: The server, or None when disabled (port 0)
+        or the port is taken by another process.
+    """
+    global _server
+    with _server_lock:
+        if _server is None and port:
+            try:
+                _server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+            except OSError:
+                return None
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+        return _server
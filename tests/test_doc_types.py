@@ -0,0 +1,45 @@
+import pytest
+
+from doc_types import DocTypeIndex, normalize_title
+
+FAMILIES = {
+    "Commercial Invoice": ["Commercial Invoice", "VAT Invoice", "Invoice"],
+    "Packing List": ["Packing List"],
+    "Contract": ["Contract", "Sales Contract", "Purchase Contract"],
+}
+
+
+@pytest.fixture
+def index():
+    return DocTypeIndex(FAMILIES)
+
+
+def test_normalize_title():
+    assert normalize_title("ORIGINAL Bill-of-Lading No. 2231") == "bill of lading"
+
+
+@pytest.mark.parametrize("title, family, method", [
+    ("INVOICE No. 2231", "Commercial Invoice", "exact"),
+    ("VAT Invoices", "Commercial Invoice", "exact"),
+    ("Sales Contract for garments", "Contract", "contains"),
+    ("Packing List of shipment", "Packing List", "contains"),
+    ("Commerical Invoice", "Commercial Invoice", "fuzzy"),
+])
+def test_classify(index, title, family, method):
+    match = index.classify(title)
+    assert (match.family, match.method) == (family, method)
+
+
+@pytest.mark.parametrize("title", [
+    # A one-word synonym inside a longer title is not enough to skip the model
+    "Proforma Invoice",
+    "Copy of Invoice",
+    "Contract Termination Notice",
+    # Titles naming two families
+    "Invoice and Packing List",
+    "Sales Contract and Invoice",
+    "Certificate of Origin",
+    "",
+])
+def test_near_misses_go_to_the_model(index, title):
+    assert index.classify(title) is None
@@ -0,0 +1,246 @@
+"""
+Small product-image thumbnails for the result cards, cached on local disk.
+
+Each product image is downloaded once, shrunk with Pillow to a WebP (or JPEG
+where Pillow lacks WebP support) of a few KB, and kept in a size-bounded LRU
+directory shared by every session of the process. Cards embed the thumbnails
+as data URIs and link to the full image.
+"""
+import base64
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+from PIL import Image, ImageOps, features
+
+THUMBNAIL_SIZE = int(os.getenv("THUMBNAIL_SIZE", 128))
+THUMBNAIL_QUALITY = int(os.getenv("THUMBNAIL_QUALITY", 60))
+THUMBNAIL_FORMAT = "WEBP" if features.check("webp") else "JPEG"
+THUMBNAIL_CACHE_DIR = os.getenv("THUMBNAIL_CACHE_DIR", os.path.join(tempfile.gettempdir(), "product-thumbnails"))
+THUMBNAIL_CACHE_MAX_BYTES = int(os.getenv("THUMBNAIL_CACHE_MAX_BYTES", 200 * 2 ** 20))
+THUMBNAIL_FETCH_WORKERS = int(os.getenv("THUMBNAIL_FETCH_WORKERS", 8))
+THUMBNAIL_FETCH_TIMEOUT = float(os.getenv("THUMBNAIL_FETCH_TIMEOUT", 10))
+# Seconds a page waits for thumbnails before rendering without the missing ones
+THUMBNAIL_WAIT = float(os.getenv("THUMBNAIL_WAIT", 2))
+# Seconds before an image that failed to download is tried again
+THUMBNAIL_RETRY_AFTER = float(os.getenv("THUMBNAIL_RETRY_AFTER", 300))
+
+
+def make_thumbnail(data, size=THUMBNAIL_SIZE, image_format=THUMBNAIL_FORMAT, quality=THUMBNAIL_QUALITY):
+    """
+    Shrinks an image so its longest side is at most `size` pixels.
+
+    Args:
+        data (bytes): The full image.
+        size (int): Maximum width and height in pixels.
+        image_format (str): 'WEBP' or 'JPEG'.
+        quality (int): Encoder quality.
+
+    Returns:
+        bytes: The encoded thumbnail.
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        # Decode at a reduced scale where the format allows it (JPEG)
+        image.draft("RGB", (size, size))
+        image = ImageOps.exif_transpose(image)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        image.thumbnail((size, size), Image.LANCZOS)
+
+        output = io.BytesIO()
+        image.save(output, format=image_format, quality=quality)
+        return output.getvalue()
+
+
+class ThumbnailCache:
+    """
+    Thread-safe, size-bounded LRU of thumbnails stored as files in `directory`.
+
+    Entries already on disk are picked up at start, oldest first, so the cache
+    survives restarts of the app.
+
+    Args:
+        directory (str): Where thumbnails are stored; created if missing.
+        max_bytes (int): Total size kept; the least recently used files are deleted.
+    """
+
+    def __init__(self, directory=THUMBNAIL_CACHE_DIR, max_bytes=THUMBNAIL_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._sizes = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        entries = []
+        for entry in os.scandir(directory):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name, stat.st_size))
+        for _, name, size in sorted(entries):
+            self._sizes[name] = size
+            self.total_bytes += size
+        with self._lock:
+            self._evict()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def get(self, key):
+        """Returns the cached thumbnail for `key`, or None."""
+        with self._lock:
+            if key not in self._sizes:
+                self.misses += 1
+                return None
+            self._sizes.move_to_end(key)
+            self.hits += 1
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+            # Recency survives restarts through the modification time
+            os.utime(self._path(key))
+            return data
+        except OSError:
+            with self._lock:
+                self.total_bytes -= self._sizes.pop(key, 0)
+            return None
+
+    def put(self, key, data):
+        # Written under a temporary name and renamed, so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, self._path(key))
+        with self._lock:
+            self.total_bytes += len(data) - self._sizes.pop(key, 0)
+            self._sizes[key] = len(data)
+            self._evict()
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and self._sizes:
+            key, size = self._sizes.popitem(last=False)
+            self.total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._sizes), "bytes": self.total_bytes,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+class ThumbnailService:
+    """
+    Downloads, shrinks and caches product images on a bounded thread pool.
+
+    Concurrent requests for the same image share one download, and an image
+    that failed is not tried again for `retry_after` seconds.
+
+    Args:
+        cache (ThumbnailCache): Where thumbnails are kept.
+        workers (int): Images downloaded at once.
+        timeout (float): Seconds allowed per download.
+        retry_after (float): Seconds before a failed image is downloaded again.
+        sign_url (callable, optional): Adds a current read SAS to an image URL before it is downloaded.
+    """
+
+    def __init__(self, cache, workers=THUMBNAIL_FETCH_WORKERS, timeout=THUMBNAIL_FETCH_TIMEOUT,
+                 retry_after=THUMBNAIL_RETRY_AFTER, sign_url=None):
+        self.cache = cache
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.sign_url = sign_url
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumbnail")
+        self._session = requests.Session()
+        self._session.mount("https://", HTTPAdapter(pool_connections=workers, pool_maxsize=workers))
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._failed = {}
+        self.failures = 0
+
+    @staticmethod
+    def cache_key(image_url):
+        # The SAS query string changes over time; the image behind the path does not
+        return f"{hashlib.sha256(image_url.split('?', 1)[0].encode('utf-8')).hexdigest()}.{THUMBNAIL_FORMAT.lower()}"
+
+    def _fetch(self, key, image_url):
+        try:
+            download_url = self.sign_url(image_url) if self.sign_url is not None else image_url
+            response = self._session.get(download_url, timeout=self.timeout)
+            response.raise_for_status()
+            data = make_thumbnail(response.content)
+            self.cache.put(key, data)
+            return data
+        except Exception:
+            now = time.monotonic()
+            with self._lock:
+                # Entries past their retry time are dropped, so the map stays bounded
+                self._failed = {failed_key: failed_at for failed_key, failed_at in self._failed.items()
+                                if now - failed_at < self.retry_after}
+                self._failed[key] = now
+                self.failures += 1
+            return None
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def get_many(self, image_urls, wait_seconds=THUMBNAIL_WAIT):
+        """
+        Returns thumbnails for many images, downloading the missing ones in parallel.
+
+        Downloads still running after `wait_seconds` carry on in the background
+        and are cached for the next page view.
+
+        Args:
+            image_urls (list): Image URLs; signed with `sign_url` when they are downloaded.
+            wait_seconds (float): How long to wait for downloads; 0 returns only cached thumbnails.
+
+        Returns:
+            dict: Thumbnail bytes by image URL, for the images that are ready.
+        """
+        thumbnails, futures = {}, {}
+        now = time.monotonic()
+        for image_url in dict.fromkeys(image_urls):
+            key = self.cache_key(image_url)
+            data = self.cache.get(key)
+            if data is not None:
+                thumbnails[image_url] = data
+                continue
+            with self._lock:
+                if key in self._failed:
+                    if now - self._failed[key] < self.retry_after:
+                        continue
+                    del self._failed[key]
+                future = self._pending.get(key)
+                if future is None:
+                    future = self._pending[key] = self._executor.submit(self._fetch, key, image_url)
+            futures[image_url] = future
+
+        if futures and wait_seconds > 0:
+            wait(futures.values(), timeout=wait_seconds)
+        for image_url, future in futures.items():
+            if future.done() and future.result() is not None:
+                thumbnails[image_url] = future.result()
+        return thumbnails
+
+    def stats(self):
+        with self._lock:
+            stats = {"pending": len(self._pending), "failures": self.failures, "failed_recently": len(self._failed)}
+        return {**self.cache.stats(), **stats}
+
+
+def data_uri(thumbnail):
+    """Embeds thumbnail bytes in a `data:` URI for an `<img>` tag."""
+    return f"data:image/{THUMBNAIL_FORMAT.lower()};base64,{base64.b64encode(thumbnail).decode('ascii')}"